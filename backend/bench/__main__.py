@@ -0,0 +1,91 @@
+# bench/__main__.py
+# Usage (depuis backend/) :
+#   python -m bench --users 20 --cellars 5 --bottles 200 --mix mixed --duration 30 -o result.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.runner import (MIXES, PAGE_SIZE, free_port, run_load, server_cpu_seconds,
+                          start_server, stop_server)
+from bench.seed import seed
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench",
+                                     description="Banc de charge de l'API Wine Cellar.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--cellars", type=int, default=3, help="caves par utilisateur")
+    parser.add_argument("--bottles", type=int, default=100, help="bouteilles par cave")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url",
+                        help="base du banc, VIDÉE avant insertion (défaut : SQLite temporaire)")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="secondes de charge")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="arrêt après ce nombre de requêtes (0 : illimité)")
+    parser.add_argument("--workers", type=int, default=1, help="workers uvicorn")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE,
+                        help="limit des routes de liste")
+    parser.add_argument("--server-log", help="fichier recevant la sortie d'uvicorn")
+    parser.add_argument("-o", "--output", help="fichier JSON du rapport (défaut : stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.mkdtemp(prefix="wine-bench-")
+        database_url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    start = time.perf_counter()
+    manifest = seed(database_url, args.users, args.cellars, args.bottles, args.seed)
+    seed_seconds = time.perf_counter() - start
+    print(f"Seeded {manifest['dataset']} in {seed_seconds:.1f}s", file=sys.stderr)
+
+    process, base_url = start_server(database_url, free_port(), args.workers, args.server_log)
+    try:
+        results = run_load(base_url, manifest, args.mix, args.concurrency, args.duration,
+                           args.requests, args.seed, args.page_size,
+                           cpu_probe=lambda: server_cpu_seconds(process.pid))
+    finally:
+        stop_server(process)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "database": database_url.split("://", 1)[0],
+        "db_mode": os.getenv("DB_MODE", "sync"),
+        "dataset": manifest["dataset"],
+        "seed_s": round(seed_seconds, 3),
+        "config": {"mix": args.mix, "weights": MIXES[args.mix], "concurrency": args.concurrency,
+                   "duration_s": args.duration, "requests": args.requests,
+                   "workers": args.workers, "page_size": args.page_size},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 0 if results["requests"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
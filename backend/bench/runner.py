@@ -0,0 +1,262 @@
+# bench/runner.py
+# Clients concurrents contre l'application réelle (uvicorn) et agrégation des latences.
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.seed import CODE_DIR, SEARCH_TERMS, random_bottle
+
+API_PATH_ROOT = "/api"
+PAGE_SIZE = 50
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Poids relatifs des opérations
+MIXES = {
+    "read": {"list_cellars": 25, "list_bottles": 35, "get_bottle": 20, "search": 20},
+    "write": {"add": 40, "update": 40, "delete": 20},
+    "mixed": {"login": 2, "list_cellars": 15, "list_bottles": 25, "get_bottle": 15, "search": 15,
+              "add": 12, "update": 10, "delete": 6},
+    "login": {"login": 1},
+}
+
+
+class UserPool:
+    """Bouteilles connues d'un utilisateur, partagées par les clients qui l'utilisent."""
+
+    def __init__(self, entry: dict):
+        self.email = entry["email"]
+        self.cellars = entry["cellars"]
+        self._bottles = list(entry["bottles"])
+        self._added = []
+        self._lock = threading.Lock()
+
+    def pick(self, rng: random.Random):
+        with self._lock:
+            ids = self._added or self._bottles
+            return rng.choice(ids) if ids else None
+
+    def add(self, bottle_id: str):
+        with self._lock:
+            self._added.append(bottle_id)
+
+    def take(self, rng: random.Random):
+        # Supprime d'abord ce que le banc a ajouté : le jeu de départ reste stable
+        with self._lock:
+            ids = self._added or self._bottles
+            if not ids:
+                return None
+            return ids.pop(rng.randrange(len(ids)))
+
+
+class Client:
+    def __init__(self, base_url: str, pool: UserPool, password: str, rng: random.Random,
+                 page_size: int = PAGE_SIZE):
+        self.base_url = base_url
+        self.page_size = page_size
+        self.pool = pool
+        self.password = password
+        self.rng = rng
+        self.http = requests.Session()
+        self.http.headers["Accept"] = "application/json"
+
+    def request(self, method: str, path: str, **kwargs):
+        return self.http.request(method, f"{self.base_url}{path}", timeout=60, **kwargs)
+
+    def login(self):
+        res = self.request("post", "/tokens",
+                           json={"email": self.pool.email, "password": self.password})
+        if res.status_code < 400:
+            self.http.headers["Authorization"] = f"Bearer {res.json()['token']}"
+        return res
+
+    def list_cellars(self):
+        return self.request("get", "/cellars", params={"limit": self.page_size})
+
+    def list_bottles(self):
+        cellar_id = self.rng.choice(self.pool.cellars)
+        return self.request("get", f"/cellars/{cellar_id}/bottles",
+                            params={"limit": self.page_size})
+
+    def get_bottle(self):
+        bottle_id = self.pool.pick(self.rng)
+        return None if bottle_id is None else self.request("get", f"/bottles/{bottle_id}")
+
+    def search(self):
+        return self.request("get", "/bottles/search",
+                            params={"q": self.rng.choice(SEARCH_TERMS), "limit": self.page_size})
+
+    def add(self):
+        cellar_id = self.rng.choice(self.pool.cellars)
+        res = self.request("post", f"/cellars/{cellar_id}/bottles",
+                           json=random_bottle(self.rng))
+        if res.status_code < 400:
+            self.pool.add(res.json()["id"])
+        return res
+
+    def update(self):
+        bottle_id = self.pool.pick(self.rng)
+        if bottle_id is None:
+            return None
+        return self.request("put", f"/bottles/{bottle_id}",
+                            json={"quantity": self.rng.randint(1, 12),
+                                  "price": round(self.rng.uniform(5, 400), 2)})
+
+    def delete(self):
+        bottle_id = self.pool.take(self.rng)
+        return None if bottle_id is None else self.request("delete", f"/bottles/{bottle_id}")
+
+
+def percentile(values: list, pct: float) -> float:
+    """Rang le plus proche, sur une liste triée."""
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))]
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    endpoints = {}
+    total = errors = 0
+    for name, (latencies, failures) in sorted(samples.items()):
+        latencies = sorted(latencies)
+        count = len(latencies)
+        total += count
+        errors += failures
+        endpoints[name] = {
+            "count": count,
+            "errors": failures,
+            "throughput_rps": round(count / elapsed, 2),
+            "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0,
+        }
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def run_load(base_url: str, manifest: dict, mix: str, concurrency: int, duration: float,
+             max_requests: int = 0, seed_value: int = 42, page_size: int = PAGE_SIZE,
+             cpu_probe=None) -> dict:
+    """Lance `concurrency` clients pendant `duration` secondes (ou `max_requests` requêtes).
+
+    `cpu_probe()` renvoie le temps CPU du serveur ; il est lu autour de la charge seule.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    weights = MIXES[mix]
+    names, cum = list(weights), list(weights.values())
+    pools = [UserPool(entry) for entry in manifest["users"]]
+    samples = {name: ([], 0) for name in names}
+    lock = threading.Lock()
+    budget = [max_requests]
+
+    clients = [Client(base_url, pools[i % len(pools)], manifest["password"],
+                      random.Random(seed_value + i), page_size) for i in range(concurrency)]
+    # Connexion initiale hors mesure
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for res in executor.map(lambda c: c.login(), clients):
+            res.raise_for_status()
+
+    deadline = time.perf_counter() + duration
+
+    def worker(client: Client):
+        while time.perf_counter() < deadline:
+            if max_requests:
+                with lock:
+                    if budget[0] <= 0:
+                        return
+                    budget[0] -= 1
+            name = client.rng.choices(names, weights=cum)[0]
+            start = time.perf_counter()
+            try:
+                res = getattr(client, name)()
+            except requests.RequestException:
+                failed = True
+            else:
+                if res is None:
+                    continue  # rien à faire (plus de bouteilles connues)
+                failed = res.status_code >= 400
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies, failures = samples[name]
+                latencies.append(elapsed)
+                samples[name] = (latencies, failures + failed)
+
+    cpu_start = cpu_probe() if cpu_probe else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, clients))
+    results = summarize(samples, time.perf_counter() - start)
+    cpu_end = cpu_probe() if cpu_probe else None
+    if cpu_start is not None and cpu_end is not None:
+        results["server_cpu_s"] = round(cpu_end - cpu_start, 3)
+        if results["requests"]:
+            results["server_cpu_ms_per_request"] = round(
+                (cpu_end - cpu_start) / results["requests"] * 1000, 3)
+    return results
+
+
+# ---- Serveur ----
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, port: int, workers: int = 1, log_path: str = None):
+    """Démarre `uvicorn main:app` sur la base du banc ; l'environnement courant est transmis."""
+    env = {**os.environ, "DATABASE_URL": database_url, "API_PATH_ROOT": API_PATH_ROOT}
+    log = open(log_path or os.devnull, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=CODE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}{API_PATH_ROOT}"
+    for _ in range(120):
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/health/db", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def server_cpu_seconds(pid: int):
+    """Temps CPU (user + system) du serveur et de ses workers, lu dans /proc (Linux)."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as file:
+            pids = [pid] + [int(child) for child in file.read().split()]
+        ticks = 0
+        for proc in pids:
+            with open(f"/proc/{proc}/stat", encoding="ascii") as file:
+                # champs 14 et 15 (utime, stime), après le nom entre parenthèses
+                fields = file.read().rsplit(")", 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])
+    except (OSError, ValueError, IndexError):
+        return None
+    return ticks / CLOCK_TICKS
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
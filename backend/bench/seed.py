@@ -0,0 +1,138 @@
+# bench/seed.py
+# Jeu de données synthétique et reproductible : N utilisateurs × M caves × K bouteilles,
+# écrit directement en base (Core, par lots) avec les modèles de l'application.
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code")
+
+PASSWORD = "bench"
+SAMPLE_BOTTLES = 500  # ids de bouteilles retenus par utilisateur pour get/update/delete
+
+NAMES = [
+    "Château Margaux", "Château Latour", "Pétrus", "Clos Vougeot", "Chablis Premier Cru",
+    "Meursault", "Hermitage", "Côte-Rôtie", "Châteauneuf-du-Pape", "Sancerre", "Pouilly-Fumé",
+    "Gewurztraminer", "Riesling Grand Cru", "Champagne Brut", "Crémant de Loire", "Sauternes",
+    "Barolo", "Brunello di Montalcino", "Chianti Classico", "Rioja Reserva", "Ribera del Duero",
+    "Malbec", "Zinfandel", "Pinot Noir", "Chardonnay", "Syrah", "Grenache", "Tokaji",
+]
+REGIONS = [
+    ("Bordeaux", "France"), ("Bourgogne", "France"), ("Rhône", "France"), ("Loire", "France"),
+    ("Alsace", "France"), ("Champagne", "France"), ("Piémont", "Italie"), ("Toscane", "Italie"),
+    ("Rioja", "Espagne"), ("Castille-et-León", "Espagne"), ("Mendoza", "Argentine"),
+    ("Napa Valley", "États-Unis"), ("Tokaj", "Hongrie"),
+]
+WINE_TYPES = ["Rouge", "Blanc", "Rosé", "Effervescent", "Liquoreux"]
+NOTES = [
+    "Fruits rouges, tanins souples", "Boisé, notes de vanille", "Minéral et tendu",
+    "Agrumes et fleurs blanches", "Épices douces, longue finale", "Bulles fines, brioche",
+    None,
+]
+
+# Mots utilisés par les recherches du banc (présents dans les données générées)
+SEARCH_TERMS = ["Château", "Pinot", "Bordeaux", "Riesling", "Barolo", "Champagne", "minéral",
+                "vanille", "Rioja", "Syrah"]
+
+
+def load_app(database_url: str):
+    """Importe les modules de l'application sur `database_url` (avant tout import de database)."""
+    os.environ["DATABASE_URL"] = database_url
+    if CODE_DIR not in sys.path:
+        sys.path.insert(0, CODE_DIR)
+    import database  # pylint: disable=import-outside-toplevel
+    import models  # pylint: disable=import-outside-toplevel
+    import fulltext  # pylint: disable=import-outside-toplevel,unused-import
+    return database, models
+
+
+def random_bottle(rng: random.Random) -> dict:
+    region, country = rng.choice(REGIONS)
+    return {
+        "name": rng.choice(NAMES),
+        "vintage": rng.randint(1960, 2023),
+        "wine_type": rng.choice(WINE_TYPES),
+        "region": region,
+        "country": country,
+        "price": round(rng.uniform(5, 400), 2),
+        "quantity": rng.randint(1, 12),
+        "notes": rng.choice(NOTES),
+    }
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def seed(database_url: str, users: int, cellars: int, bottles: int, seed_value: int = 42,
+         batch_size: int = 1000) -> dict:
+    """Recrée le schéma puis insère le jeu de données. La base cible est VIDÉE.
+
+    Retourne le manifeste utilisé par les clients du banc (identifiants, caves, bouteilles).
+    """
+    # pylint: disable=too-many-locals
+    database, models = load_app(database_url)
+    from passwords import pwd_context  # pylint: disable=import-outside-toplevel
+    from sqlalchemy import insert  # pylint: disable=import-outside-toplevel
+
+    engine = database.get_db_engine()
+    database.Base.metadata.drop_all(engine)
+    database.init_db()
+
+    rng = random.Random(seed_value)
+    hashed = pwd_context.hash(PASSWORD)  # un seul hash bcrypt pour tout le jeu
+    start = datetime.now() - timedelta(days=365)
+    manifest = {"password": PASSWORD, "users": [], "terms": SEARCH_TERMS}
+    batch = []
+    tick = 0
+
+    def stamp():
+        # created_at strictement croissants : pas d'égalités dans l'ordre de pagination
+        nonlocal tick
+        tick += 1
+        return start + timedelta(milliseconds=tick)
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": i, "email": f"bench{i}@example.com", "username": f"bench{i}",
+             "hashed_password": hashed, "is_active": True, "is_admin": False,
+             "created_at": stamp(), "updated_at": stamp()}
+            for i in range(1, users + 1)
+        ])
+
+        for user_id in range(1, users + 1):
+            entry = {"email": f"bench{user_id}@example.com", "cellars": [], "bottles": []}
+            for c in range(cellars):
+                cellar_id = _uuid(rng)
+                rows = []
+                for _ in range(bottles):
+                    row = random_bottle(rng)
+                    row.update(id=_uuid(rng), cellar_id=cellar_id, created_at=stamp())
+                    row["updated_at"] = row["created_at"]
+                    rows.append(row)
+                    if len(entry["bottles"]) < SAMPLE_BOTTLES:
+                        entry["bottles"].append(row["id"])
+                conn.execute(insert(models.WineCellar), [{
+                    "id": cellar_id, "user_id": user_id, "name": f"Cave {user_id}-{c}",
+                    "location": "Bench", "capacity": None,
+                    "bottle_count": len(rows),
+                    "total_quantity": sum(r["quantity"] for r in rows),
+                    "total_value": sum(r["price"] * r["quantity"] for r in rows),
+                    "version": 1, "created_at": stamp(), "updated_at": stamp(),
+                }])
+                entry["cellars"].append(cellar_id)
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        conn.execute(insert(models.WineBottle), batch)
+                        batch = []
+            manifest["users"].append(entry)
+        if batch:
+            conn.execute(insert(models.WineBottle), batch)
+
+    engine.dispose()
+    manifest["dataset"] = {"users": users, "cellars": users * cellars,
+                           "bottles": users * cellars * bottles, "seed": seed_value}
+    return manifest
@@ -0,0 +1,55 @@
+# cascades.py
+# Suppression d'une cave / d'un utilisateur en un nombre constant de requêtes :
+# la base supprime les enfants via ondelete="CASCADE". Quand les clés étrangères ne sont
+# pas appliquées (SQLite sans PRAGMA foreign_keys), repli par lots d'identifiants.
+import os
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+import models
+
+CASCADE_BATCH_SIZE = int(os.getenv("CASCADE_BATCH_SIZE", "5000"))
+
+
+def foreign_keys_enforced(db: Session) -> bool:
+    conn = db.connection()
+    if conn.dialect.name != "sqlite":
+        return True
+    return bool(conn.exec_driver_sql("PRAGMA foreign_keys").scalar())
+
+
+def _delete_in_batches(db: Session, model, condition, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        ids = db.scalars(select(model.id).where(condition).limit(batch_size)).all()
+        if not ids:
+            return deleted
+        db.execute(delete(model).where(model.id.in_(ids))
+                   .execution_options(synchronize_session=False))
+        deleted += len(ids)
+
+
+def delete_cellar(db: Session, cellar_id: str, batch_size: int = CASCADE_BATCH_SIZE):
+    """Supprime la cave et ses bouteilles (sans commit)."""
+    if not foreign_keys_enforced(db):
+        _delete_in_batches(db, models.WineBottle, models.WineBottle.cellar_id == cellar_id,
+                           batch_size)
+    db.execute(delete(models.WineCellar).where(models.WineCellar.id == cellar_id)
+               .execution_options(synchronize_session=False))
+
+
+def delete_user(db: Session, user_id: int, batch_size: int = CASCADE_BATCH_SIZE):
+    """Supprime l'utilisateur, ses caves, bouteilles, tokens et permissions (sans commit)."""
+    if not foreign_keys_enforced(db):
+        cellar_ids = select(models.WineCellar.id).where(models.WineCellar.user_id == user_id)
+        _delete_in_batches(db, models.WineBottle, models.WineBottle.cellar_id.in_(cellar_ids),
+                           batch_size)
+        for statement in (
+            delete(models.WineCellar).where(models.WineCellar.user_id == user_id),
+            delete(models.Token).where(models.Token.user_id == user_id),
+            delete(models.user_permissions).where(models.user_permissions.c.user_id == user_id),
+        ):
+            db.execute(statement.execution_options(synchronize_session=False))
+    db.execute(delete(models.User).where(models.User.id == user_id)
+               .execution_options(synchronize_session=False))
@@ -0,0 +1,68 @@
+# counters.py
+# Compteurs dénormalisés de WineCellar (bottle_count, total_quantity, total_value),
+# tenus à jour dans la même transaction que les écritures sur WineBottle.
+from sqlalchemy import func, or_, select, update
+
+import models
+
+
+def bottle_quantity(quantity) -> int:
+    """Quantité comptée pour une bouteille : NULL vaut 1 (comme `coalesce(quantity, 1)`), 0 vaut 0."""
+    return 1 if quantity is None else quantity
+
+
+def bottle_value(price, quantity) -> float:
+    return (price or 0) * bottle_quantity(quantity)
+
+
+def cellar_delta(cellar_id: str, bottles: int = 0, quantity: int = 0, value: float = 0.0,
+                 check_capacity: bool = False):
+    """UPDATE atomique `x = x + :delta`, qui incrémente aussi `version`.
+
+    Avec `check_capacity`, la ligne n'est modifiée que si la capacité n'est pas dépassée :
+    un `rowcount` à 0 signifie « cave pleine » (ou cave inexistante).
+    """
+    cellar = models.WineCellar
+    stmt = (
+        update(cellar)
+        .where(cellar.id == cellar_id)
+        .values(
+            bottle_count=cellar.bottle_count + bottles,
+            total_quantity=cellar.total_quantity + quantity,
+            total_value=cellar.total_value + value,
+            version=cellar.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if check_capacity and quantity > 0:
+        stmt = stmt.where(or_(cellar.capacity.is_(None),
+                              cellar.total_quantity + quantity <= cellar.capacity))
+    return stmt
+
+
+def cellar_versions(cellar_ids):
+    """SELECT (id, version) des caves, à exécuter dans la transaction qui vient de les
+    incrémenter : ce sont alors les versions de cette écriture (événements d'invalidation)."""
+    cellar = models.WineCellar
+    return select(cellar.id, cellar.version).where(cellar.id.in_(list(cellar_ids)))
+
+
+def recompute_counters(cellar_id: str = None):
+    """Recalcule les compteurs depuis wine_bottles (job de réparation admin)."""
+    cellar = models.WineCellar
+    bottle = models.WineBottle
+    quantity = func.coalesce(bottle.quantity, 1)
+
+    def scalar(expr):
+        return select(expr).where(bottle.cellar_id == cellar.id).scalar_subquery()
+
+    stmt = update(cellar).values(
+        bottle_count=scalar(func.count(bottle.id)),
+        total_quantity=scalar(func.coalesce(func.sum(quantity), 0)),
+        total_value=scalar(func.coalesce(
+            func.sum(func.coalesce(bottle.price, 0) * quantity), 0)),
+        version=cellar.version + 1,
+    ).execution_options(synchronize_session=False)
+    if cellar_id is not None:
+        stmt = stmt.where(cellar.id == cellar_id)
+    return stmt
@@ -1,23 +1,42 @@
 import os
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
 import jwt
 
-from database import get_db
+from cache import TTLCache
+from database import ReadSession, get_db, get_async_db, replicas
+from invalidation import ALL, bus
 import models
 
 security = HTTPBearer()
 JWT_SECRET = os.getenv("JWT_SECRET", "change_me_super_secret")
 API_PATH_ROOT = os.getenv("API_PATH_ROOT", "")
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> models.User:
-    token = credentials.credentials
+# Utilisateurs authentifiés, par id (invalidé via le bus par update_user / delete_user / admin)
+user_cache = TTLCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+                      ttl=float(os.getenv("USER_CACHE_TTL", "60")))
+
+
+def _invalidate_user(entity, user_id, remote):  # pylint: disable=unused-argument
+    if entity == ALL[0]:
+        user_cache.clear()
+    else:
+        user_cache.invalidate(user_id)
+
+
+bus.subscribe(("user", ALL[0]), _invalidate_user)
+
+USER_CACHE_COLUMNS = [c.key for c in models.User.__table__.columns]
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def get_token_user_id(request: Request,
+                      credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
+    """Id de l'utilisateur du jeton d'accès, sans aucun accès à la base."""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=["HS256"])
         if payload.get("type") != "access":
             raise HTTPException(status_code=401, detail="Invalid token type")
         user_id = int(payload.get("sub"))
@@ -26,12 +45,130 @@ def get_current_user(
     except Exception as exc:
         raise HTTPException(status_code=401, detail="Invalid authentication token") from exc
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if replicas and request.method not in SAFE_METHODS:
+        # Ses prochaines lectures iront sur le primaire (délai de réplication)
+        replicas.mark_write(user_id)
+    return user_id
+
+
+async def _get_replica_db(request: Request, db: AsyncSession = Depends(get_async_db),
+                          user_id: int = Depends(get_token_user_id)):
+    replica = replicas.pick(user_id) if request.method in SAFE_METHODS else None
+    if replica is None:
+        yield db
+        return
+    session = ReadSession(replica, db)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+# Dépendance des routes de lecture : un réplica si DATABASE_READ_URLS est défini
+get_read_db = _get_replica_db if replicas else get_async_db
+
+
+async def get_current_user(
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_read_db)
+) -> models.User:
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        # Instance détachée neuve : jamais partagée entre deux requêtes.
+        # `db` n'a exécuté aucune requête : aucune connexion n'a été prise au pool.
+        return models.User(**cached)
+
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    user_cache.set(user_id, {key: getattr(user, key) for key in USER_CACHE_COLUMNS})
     return user
 
+
 def admin_required(current_user: models.User = Depends(get_current_user)) -> models.User:
     if not current_user.is_admin:  # type: ignore
         raise HTTPException(status_code=403, detail="Admin privileges required")
     return current_user
+
+
+# ---- Ownership ----
+# Un seul SELECT (bouteille + cave jointe) restreint au propriétaire, sauf pour un admin.
+# Un objet qui n'appartient pas à l'utilisateur est traité comme inexistant (404).
+def _owned_cellar_stmt(cellar_id: str, user: models.User):
+    stmt = select(models.WineCellar).where(models.WineCellar.id == cellar_id)
+    if not user.is_admin:
+        stmt = stmt.where(models.WineCellar.user_id == user.id)
+    return stmt
+
+
+def owned_bottles_stmt(user: models.User, *criteria):
+    """SELECT des bouteilles (cave jointe) visibles par `user`, filtré par `criteria`."""
+    stmt = (
+        select(models.WineBottle)
+        .join(models.WineBottle.cellar)
+        .options(contains_eager(models.WineBottle.cellar))
+        .where(*criteria)
+    )
+    if not user.is_admin:
+        stmt = stmt.where(models.WineCellar.user_id == user.id)
+    return stmt
+
+
+def owned_bottle_rows_stmt(user: models.User, stmt, *criteria):
+    """Variante Core de owned_bottles_stmt : `stmt` sélectionne des colonnes de wine_bottles."""
+    stmt = (stmt.join(models.WineCellar, models.WineBottle.cellar_id == models.WineCellar.id)
+            .where(*criteria))
+    if not user.is_admin:
+        stmt = stmt.where(models.WineCellar.user_id == user.id)
+    return stmt
+
+
+def _owned_bottle_stmt(bottle_id: str, user: models.User):
+    return owned_bottles_stmt(user, models.WineBottle.id == bottle_id)
+
+
+async def fetch_owned_cellar(db: AsyncSession, cellar_id: str,
+                             user: models.User) -> models.WineCellar:
+    cellar = await db.scalar(_owned_cellar_stmt(cellar_id, user))
+    if not cellar:
+        raise HTTPException(status_code=404, detail="Cave à vin non trouvée")
+    return cellar
+
+
+async def fetch_owned_bottle(db: AsyncSession, bottle_id: str,
+                             user: models.User) -> models.WineBottle:
+    bottle = await db.scalar(_owned_bottle_stmt(bottle_id, user))
+    if not bottle:
+        raise HTTPException(status_code=404, detail="Bouteille non trouvée")
+    return bottle
+
+
+async def owned_cellar_async(cellar_id: str, db: AsyncSession = Depends(get_read_db),
+                             current_user: models.User = Depends(get_current_user)
+                             ) -> models.WineCellar:
+    return await fetch_owned_cellar(db, cellar_id, current_user)
+
+
+async def owned_bottle_async(bottle_id: str, db: AsyncSession = Depends(get_read_db),
+                             current_user: models.User = Depends(get_current_user)
+                             ) -> models.WineBottle:
+    return await fetch_owned_bottle(db, bottle_id, current_user)
+
+
+# Variantes synchrones pour les routes d'écriture : la ligne est verrouillée (FOR UPDATE)
+# et rattachée à la session de get_db.
+def owned_cellar(cellar_id: str, db: Session = Depends(get_db),
+                 current_user: models.User = Depends(get_current_user)) -> models.WineCellar:
+    cellar = db.scalar(_owned_cellar_stmt(cellar_id, current_user).with_for_update())
+    if not cellar:
+        raise HTTPException(status_code=404, detail="Cave à vin non trouvée")
+    return cellar
+
+
+def owned_bottle(bottle_id: str, db: Session = Depends(get_db),
+                 current_user: models.User = Depends(get_current_user)) -> models.WineBottle:
+    bottle = db.scalar(_owned_bottle_stmt(bottle_id, current_user)
+                       .with_for_update(of=models.WineBottle))
+    if not bottle:
+        raise HTTPException(status_code=404, detail="Bouteille non trouvée")
+    return bottle
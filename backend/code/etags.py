@@ -0,0 +1,36 @@
+# etags.py
+import hashlib
+import os
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "private, no-cache")
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match utilise la comparaison faible (W/ ignoré)
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Vrai si l'If-None-Match de la requête correspond à `etag`."""
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and _matches(if_none_match, etag)
+
+
+def check_etag(request: Request, response: Response, etag: str):
+    """Pose ETag / Cache-Control ; retourne une réponse 304 si le client est à jour."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+    response.headers.update(headers)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,86 @@
+# fulltext.py
+# Recherche plein texte sur WineBottle (name, notes, region) :
+# - MySQL : index FULLTEXT + MATCH ... AGAINST (mode booléen, préfixes)
+# - SQLite : table virtuelle FTS5 maintenue par triggers, classement bm25
+# - autres bases : repli sur LIKE, sans classement
+import re
+
+from sqlalchemy import DDL, Float, column, event, literal, literal_column, or_, table, type_coerce
+from sqlalchemy.dialects.mysql import match
+
+import models
+
+FTS_COLUMNS = ("name", "notes", "region")
+FTS_TABLE = "wine_bottles_fts"
+
+_bottles = models.WineBottle.__table__
+_cols = ", ".join(FTS_COLUMNS)
+_new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+_MYSQL_DDL = [
+    f"CREATE FULLTEXT INDEX ft_wine_bottles_text ON wine_bottles ({_cols})",
+]
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{_cols}, content='wine_bottles', content_rowid='rowid')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON wine_bottles BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_cols}) VALUES (new.rowid, {_new}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON wine_bottles BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_cols}) "
+    f"VALUES ('delete', old.rowid, {_old}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON wine_bottles BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_cols}) "
+    f"VALUES ('delete', old.rowid, {_old}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_cols}) VALUES (new.rowid, {_new}); END",
+]
+
+for _statement in _MYSQL_DDL:
+    event.listen(_bottles, "after_create", DDL(_statement).execute_if(dialect="mysql"))
+for _statement in _SQLITE_DDL:
+    event.listen(_bottles, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(_bottles, "after_drop",
+             DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+
+def _terms(query: str):
+    return re.findall(r"\w+", query)
+
+
+def fulltext_search(stmt, query: str, dialect_name: str):
+    """Ajoute le filtre plein texte à `stmt`.
+
+    Retourne `(stmt, score, descending)` : `score` est l'expression de pertinence
+    et `descending` le sens dans lequel la trier (meilleurs résultats d'abord).
+    Si `query` ne contient aucun mot, aucun résultat n'est renvoyé.
+    """
+    bottle = models.WineBottle
+    terms = _terms(query)
+    if not terms:
+        return stmt.where(literal(False)), type_coerce(literal(0.0), Float).label("score"), True
+
+    if dialect_name == "mysql":
+        against = " ".join(f"+{term}*" for term in terms)
+        expr = match(*(getattr(bottle, c) for c in FTS_COLUMNS), against=against)
+        expr = expr.in_boolean_mode()
+        score = type_coerce(expr, Float).label("score")
+        return stmt.where(expr), score, True
+
+    if dialect_name == "sqlite":
+        against = " ".join(f'"{term}"*' for term in terms)
+        fts = literal_column(FTS_TABLE)
+        stmt = (
+            stmt.join(_fts, _fts.c.rowid == literal_column("wine_bottles.rowid"))
+            .where(fts.op("MATCH")(against))
+        )
+        # bm25 : plus la valeur est basse, plus le document est pertinent
+        score = type_coerce(literal_column(f"bm25({FTS_TABLE})"), Float).label("score")
+        return stmt, score, False
+
+    for term in terms:
+        stmt = stmt.where(or_(*(
+            getattr(bottle, c).icontains(term, autoescape=True) for c in FTS_COLUMNS
+        )))
+    return stmt, type_coerce(literal(0.0), Float).label("score"), True
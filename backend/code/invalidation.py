@@ -0,0 +1,201 @@
+# invalidation.py
+# Bus d'invalidation entre workers : les routes d'écriture publient des événements
+# (entité, id, version), appliqués tout de suite dans le worker courant puis diffusés
+# aux autres, qui purgent leurs caches en mémoire (utilisateurs, réponses).
+# Les caves et les bouteilles publient la version de la cave après l'écriture : un
+# événement rejoué ou arrivé après un plus récent est ignoré. Les événements sans
+# version (utilisateurs, suppressions de caves, ALL) sont toujours appliqués.
+#
+# Transport (INVALIDATION_TRANSPORT) :
+#   ""              : aucun, un seul worker
+#   "unix:<dossier>": datagrammes Unix entre les workers d'une même machine
+#   "redis://..."   : pub/sub Redis (dépendance optionnelle : pip install redis)
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from cache import TTLCache
+
+INVALIDATION_TRANSPORT = os.getenv("INVALIDATION_TRANSPORT", "")
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "wine-cellar:invalidation")
+
+logger = logging.getLogger("invalidation")
+
+ALL = ("all", 0)
+
+
+# ---- Transports ----
+class Transport:
+    """Diffuse des messages (bytes) aux autres workers et remonte ceux qu'ils envoient."""
+
+    def start(self, callback):
+        """Commence à recevoir ; `callback(payload)` est appelé depuis un thread dédié."""
+
+    def publish(self, payload: bytes):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalTransport(Transport):
+    """Un seul worker : rien à diffuser."""
+
+    def publish(self, payload):
+        pass
+
+
+class SocketTransport(Transport):
+    """Stand-in local : un socket datagramme Unix par worker dans un dossier commun ;
+    publier, c'est envoyer le message à chaque socket du dossier."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._recv = None
+        self._send = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._send.setblocking(False)  # un worker bloqué ne doit pas bloquer l'écriture
+
+    def start(self, callback):
+        self._recv = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._recv.bind(self.path)
+
+        def loop():
+            while True:
+                try:
+                    payload = self._recv.recv(65536)
+                except OSError:
+                    return  # socket fermé
+                callback(payload)
+
+        threading.Thread(target=loop, name="invalidation-socket", daemon=True).start()
+
+    def publish(self, payload):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or path == self.path:
+                continue
+            try:
+                self._send.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # worker arrêté sans nettoyage
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError as exc:
+                logger.warning("Invalidation not delivered to %s: %s", name, exc)
+
+    def close(self):
+        if self._recv is not None:
+            self._recv.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        self._send.close()
+
+
+class RedisTransport(Transport):
+    def __init__(self, url: str, channel: str = INVALIDATION_CHANNEL):
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise RuntimeError("INVALIDATION_TRANSPORT=redis:// requires the redis package") from exc
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = None
+
+    def start(self, callback):
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: lambda message: callback(message["data"])})
+        self._pubsub.run_in_thread(daemon=True, sleep_time=1)
+
+    def publish(self, payload):
+        self._client.publish(self.channel, payload)
+
+    def close(self):
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+def make_transport(spec: str) -> Transport:
+    if not spec:
+        return LocalTransport()
+    if spec.startswith("unix:"):
+        return SocketTransport(spec[len("unix:"):])
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisTransport(spec)
+    raise RuntimeError(f"Unknown INVALIDATION_TRANSPORT: {spec}")
+
+
+# ---- Bus ----
+class InvalidationBus:
+    def __init__(self, transport: Transport):
+        self.transport = transport
+        self.origin = uuid.uuid4().hex  # ignore ses propres messages (Redis les renvoie)
+        self._handlers = {}  # entité -> [handler(entité, id, remote)]
+        self._seen = TTLCache(maxsize=10000, ttl=3600)  # (entité, id) -> dernière version
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, entities, handler):
+        for entity in entities:
+            self._handlers.setdefault(entity, []).append(handler)
+
+    def _apply(self, entity, entity_id, version, remote: bool):
+        if version is not None:
+            # événement rejoué ou arrivé après un plus récent
+            last = self._seen.get((entity, entity_id))
+            if last is not None and version <= last:
+                return
+            self._seen.set((entity, entity_id), version)
+        for handler in self._handlers.get(entity, ()):
+            try:
+                handler(entity, entity_id, remote)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.warning("Invalidation handler failed for %s %s: %s", entity, entity_id, exc)
+
+    def publish(self, *events):
+        """`events` : tuples (entité, id) ou (entité, id, version)."""
+        events = [(e[0], e[1], e[2] if len(e) > 2 else None) for e in events]
+        for entity, entity_id, version in events:
+            self._apply(entity, entity_id, version, remote=False)
+        if not events or isinstance(self.transport, LocalTransport):
+            return
+        self.published += 1
+        try:
+            self.transport.publish(json.dumps({"origin": self.origin, "events": events}).encode())
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            # les autres workers garderont leurs entrées jusqu'à expiration (TTL)
+            logger.warning("Invalidation publish failed: %s", exc)
+
+    def receive(self, payload: bytes):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Malformed invalidation message ignored")
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        for entity, entity_id, version in message["events"]:
+            self._apply(entity, entity_id, version, remote=True)
+
+    def start(self):
+        self.transport.start(self.receive)
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self) -> dict:
+        return {"transport": type(self.transport).__name__,
+                "published": self.published, "received": self.received}
+
+
+bus = InvalidationBus(make_transport(INVALIDATION_TRANSPORT))
+publish = bus.publish
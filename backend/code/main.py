@@ -1,9 +1,15 @@
 # main.py
-from database import logger, init_db
+import os
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from database import logger, init_db, get_db_session
 # import database
-from routes import users, tokens, permissions, cellars, bottles, admin  # import routers
+from routes import users, tokens, permissions, cellars, bottles, admin, health, metrics, debug  # import routers
+from metrics import MetricsMiddleware
+from invalidation import bus
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 print("Start")
@@ -13,8 +19,10 @@ app = FastAPI(
     title="Wine Cellar Management API",
     description="API pour gérer utilisateurs, permissions, caves à vin et bouteilles.",
     version="1.0.0",
+    default_response_class=ORJSONResponse,  # orjson plutôt que json de la stdlib
 )
 
+# Connexion + création des tables (une seule fois par process)
 init_db()
 
 # CORS (dev-friendly)
@@ -24,7 +32,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Link", "X-Next-Cursor", "ETag", "Server-Timing"],
 )
+# Latence / statuts / requêtes SQL par route (ajouté en dernier : enveloppe tout le reste)
+app.add_middleware(MetricsMiddleware)
 
 # include routers
 app.include_router(tokens.router)
@@ -33,15 +44,45 @@ app.include_router(permissions.router)
 app.include_router(cellars.router)
 app.include_router(bottles.router)
 app.include_router(admin.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
+app.include_router(debug.router)
 
+TOKEN_SWEEP_INTERVAL = int(os.getenv("TOKEN_SWEEP_INTERVAL", "3600"))
 
 
+def _sweep_tokens_once():
+    db = get_db_session()
+    try:
+        tokens.sweep_expired_tokens(db)
+    finally:
+        db.close()
+
+
+async def _token_sweeper():
+    while True:
+        try:
+            await run_in_threadpool(_sweep_tokens_once)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning("Token sweeper failed: %s", exc)
+        await asyncio.sleep(TOKEN_SWEEP_INTERVAL)
+
 
 @app.on_event("startup")
-def on_startup():
-    # Create tables if not exist
-    init_db()
-    # pass
+async def on_startup():
+    # Réception des invalidations publiées par les autres workers
+    bus.start()
+    if TOKEN_SWEEP_INTERVAL > 0:
+        app.state.token_sweeper = asyncio.create_task(_token_sweeper())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    sweeper = getattr(app.state, "token_sweeper", None)
+    if sweeper is not None:
+        sweeper.cancel()
+    bus.close()
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+# metrics.py
+# Mesures par requête (latence, statut, requêtes SQL, temps DB), exposées au format
+# texte Prometheus sur /metrics et dans l'en-tête Server-Timing de chaque réponse.
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_BUCKETS = tuple(float(b) for b in os.getenv(
+    "METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10").split(","))
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+
+class RequestStats:
+    """Compteurs de la requête HTTP en cours (partagés avec le threadpool via contextvars)."""
+
+    __slots__ = ("method", "scope", "queries", "db_time", "statements")
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = {}  # texte SQL -> nombre d'exécutions (détection N+1)
+
+    @property
+    def route(self):
+        # Le routeur pose scope["route"] une fois la route résolue
+        return getattr(self.scope.get("route"), "path", None)
+
+
+current_request: ContextVar = ContextVar("current_request", default=None)
+
+
+class Registry:
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = tuple(sorted(buckets))
+        self.in_flight = 0
+        self.requests = {}   # (method, route, status) -> count
+        self.latency = {}    # (method, route) -> [bucket counts..., sum, count]
+        self.db = {}         # (method, route) -> [queries, seconds]
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, stats: RequestStats, status: int, seconds: float):
+        key = (stats.method, stats.route or "unmatched")
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            hist = self.latency.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+            db = self.db.setdefault(key, [0, 0.0])
+            db[0] += stats.queries
+            db[1] += stats.db_time
+
+    def render(self) -> str:
+        """Format d'exposition texte Prometheus (version 0.0.4)."""
+        def labels(method, route, **extra):
+            pairs = {"method": method, "route": route, **extra}
+            return ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items())
+
+        with self._lock:
+            lines = [
+                "# HELP http_requests_in_flight Requests currently being served.",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_requests_total Requests served, by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{{{labels(method, route, status=status)}}} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency, by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), hist in sorted(self.latency.items()):
+                for bound, count in zip(self.buckets, hist):
+                    lines.append("http_request_duration_seconds_bucket"
+                                 f"{{{labels(method, route, le=_float(bound))}}} {count}")
+                lines.append("http_request_duration_seconds_bucket"
+                             f"{{{labels(method, route, le='+Inf')}}} {hist[-1]}")
+                lines.append(f"http_request_duration_seconds_sum{{{labels(method, route)}}} "
+                             f"{_float(hist[-2])}")
+                lines.append(f"http_request_duration_seconds_count{{{labels(method, route)}}} "
+                             f"{hist[-1]}")
+
+            lines += [
+                "# HELP db_queries_total SQL statements executed while serving requests.",
+                "# TYPE db_queries_total counter",
+            ]
+            for (method, route), (queries, _) in sorted(self.db.items()):
+                lines.append(f"db_queries_total{{{labels(method, route)}}} {queries}")
+            lines += [
+                "# HELP db_query_seconds_total Time spent in SQL statements while serving requests.",
+                "# TYPE db_query_seconds_total counter",
+            ]
+            for (method, route), (_, seconds) in sorted(self.db.items()):
+                lines.append(f"db_query_seconds_total{{{labels(method, route)}}} {_float(seconds)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _float(value: float) -> str:
+    return repr(float(value))
+
+
+registry = Registry()
+
+
+# ---- SQLAlchemy ----
+# Écouteurs posés sur la classe Engine : moteurs sync et async (sync_engine) compris.
+# C'est l'unique chronométrage des requêtes SQL ; les autres consommateurs (journal des
+# requêtes lentes...) s'y abonnent avec on_statement().
+_statement_listeners = []
+
+
+def on_statement(listener):
+    """Abonne `listener(conn, statement, parameters, context, executemany, elapsed)`,
+    appelé après chaque requête SQL réussie (`elapsed` en secondes)."""
+    _statement_listeners.append(listener)
+    return listener
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument,too-many-arguments
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument,too-many-arguments
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    for listener in _statement_listeners:
+        listener(conn, statement, parameters, context, executemany, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Requête en échec : after_cursor_execute n'est pas appelé, on retire son départ
+    # pour ne pas décaler les mesures suivantes sur cette connexion du pool
+    conn = exception_context.connection
+    starts = conn.info.get("query_start") if conn is not None else None
+    if starts:
+        starts.pop()
+
+
+# ---- ASGI ----
+class MetricsMiddleware:
+    """Middleware ASGI pur : pas de tâche intermédiaire, le contexte suit la requête."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        registry.enter()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    total = (time.perf_counter() - start) * 1000
+                    timing = (f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                              f"app;dur={total:.2f}")
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.record(stats, status, time.perf_counter() - start)
+            current_request.reset(token)
@@ -2,7 +2,7 @@
 from datetime import datetime
 import uuid
 from sqlalchemy import (
-    Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Table
+    Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Table, Index, CHAR
 )
 from sqlalchemy.orm import relationship
 
@@ -26,6 +26,9 @@ user_permissions = Table(
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -37,15 +40,22 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     permissions = relationship("Permission", secondary=user_permissions, back_populates="users")
-    cellars = relationship("WineCellar", back_populates="owner", cascade="all, delete-orphan")
+    # passive_deletes : les enfants sont supprimés par la base (ondelete="CASCADE"), sans être
+    # chargés en mémoire ; voir cascades.py pour le repli quand les FK ne sont pas appliquées
+    cellars = relationship("WineCellar", back_populates="owner", cascade="all, delete-orphan",
+                           passive_deletes=True)
 
 
 class Permission(Base):
     __tablename__ = "permissions"
+    __table_args__ = (
+        Index("ix_permissions_created_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(128), unique=True, nullable=False)
     description = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
 
     users = relationship("User", secondary=user_permissions, back_populates="permissions")
 
@@ -55,8 +65,9 @@ class Token(Base):
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    refresh_token = Column(String(512), nullable=False, unique=False, index=True)
-    expires_at = Column(DateTime, nullable=False)
+    # sha256 (hex) du jti du refresh token : jamais le JWT lui-même
+    jti_hash = Column(CHAR(64), nullable=False, unique=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.now)
 
     user = relationship("User")
@@ -64,21 +75,43 @@ class Token(Base):
 
 class WineCellar(Base):
     __tablename__ = "wine_cellars"
+    __table_args__ = (
+        # pagination par curseur : WHERE user_id = ? ORDER BY created_at, id
+        Index("ix_wine_cellars_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(255), nullable=False)
     location = Column(String(255), nullable=True)
     capacity = Column(Integer, nullable=True)
+    # Compteurs dénormalisés (voir counters.py), réparables via /admin/repair-counters
+    bottle_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_quantity = Column(Integer, nullable=False, default=0, server_default="0")
+    total_value = Column(Float, nullable=False, default=0, server_default="0")
+    # Incrémenté à chaque écriture sur la cave ou ses bouteilles (ETag, caches)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     owner = relationship("User", back_populates="cellars")
-    bottles = relationship("WineBottle", back_populates="cellar", cascade="all, delete-orphan")
+    bottles = relationship("WineBottle", back_populates="cellar", cascade="all, delete-orphan",
+                           passive_deletes=True)
 
 
 class WineBottle(Base):
     __tablename__ = "wine_bottles"
+    __table_args__ = (
+        # pagination par curseur : WHERE cellar_id = ? ORDER BY created_at, id
+        Index("ix_wine_bottles_cellar_created_id", "cellar_id", "created_at", "id"),
+        # recherche (/bottles/search) : égalité sur la cave puis plage / préfixe
+        Index("ix_wine_bottles_cellar_vintage", "cellar_id", "vintage"),
+        Index("ix_wine_bottles_cellar_type_vintage", "cellar_id", "wine_type", "vintage"),
+        Index("ix_wine_bottles_cellar_region", "cellar_id", "region"),
+        Index("ix_wine_bottles_cellar_country", "cellar_id", "country"),
+        Index("ix_wine_bottles_cellar_price", "cellar_id", "price"),
+        Index("ix_wine_bottles_cellar_name", "cellar_id", "name"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     cellar_id = Column(String(36), ForeignKey("wine_cellars.id", ondelete="CASCADE"),nullable=False)
@@ -0,0 +1,86 @@
+# pagination.py
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Response
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+
+
+class PageParams:
+    """Paramètres `limit` / `cursor` communs aux routes de liste."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="Curseur opaque (X-Next-Cursor)"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(value, ident) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, ident], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort=None):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, ident = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if value is not None and (sort is None or sort.type.python_type is datetime):
+            value = datetime.fromisoformat(value)
+        return value, ident
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def _after(sort, ident_col, value, ident, descending: bool):
+    # MySQL et SQLite placent les NULL en premier en ASC et en dernier en DESC
+    nullable = getattr(sort.expression, "nullable", False)
+    if descending:
+        if value is None:
+            return and_(sort.is_(None), ident_col < ident)
+        cond = or_(sort < value, and_(sort == value, ident_col < ident))
+        return or_(cond, sort.is_(None)) if nullable else cond
+    if value is None:
+        return or_(sort.is_not(None), and_(sort.is_(None), ident_col > ident))
+    return or_(sort > value, and_(sort == value, ident_col > ident))
+
+
+def keyset(stmt, model, page: PageParams, sort=None, descending: bool = False):
+    """Trie sur (sort, id) et ne lit que la page demandée (+1 ligne pour la suite).
+
+    `sort` vaut `model.created_at` par défaut.
+    """
+    sort = model.created_at if sort is None else sort
+    if page.cursor:
+        value, ident = decode_cursor(page.cursor, sort)
+        stmt = stmt.where(_after(sort, model.id, value, ident, descending))
+    if descending:
+        stmt = stmt.order_by(sort.desc(), model.id.desc())
+    else:
+        stmt = stmt.order_by(sort, model.id)
+    return stmt.limit(page.limit + 1)
+
+
+def paginate(rows, page: PageParams, request: Request, response: Response, sort=None):
+    """Coupe la ligne de trop et expose le curseur suivant dans les en-têtes."""
+    rows = list(rows)
+    if len(rows) <= page.limit:
+        return rows
+    rows = rows[:page.limit]
+    last = rows[-1]
+    sort_key = "created_at" if sort is None else sort.key
+    next_cursor = encode_cursor(getattr(last, sort_key), last.id)
+    next_url = request.url.include_query_params(cursor=next_cursor, limit=page.limit)
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return rows
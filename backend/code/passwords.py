@@ -0,0 +1,124 @@
+# passwords.py
+# Hash / vérification bcrypt dans un pool de processus dédié et borné, attendu depuis la
+# boucle d'événements : un pic de connexions n'occupe ni le GIL ni le threadpool des workers.
+import asyncio
+import os
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+PASSWORD_TIMEOUT = float(os.getenv("PASSWORD_TIMEOUT", "10"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_LIMIT)
+
+
+class PasswordStats:
+    """Durées des opérations bcrypt, vues depuis le worker HTTP (attente comprise)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.ops = {name: {"count": 0, "total": 0.0, "max": 0.0} for name in ("hash", "verify")}
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.in_flight -= 1
+            op = self.ops[name]
+            op["count"] += 1
+            op["total"] += seconds
+            op["max"] = max(op["max"], seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {
+                "workers": PASSWORD_WORKERS,
+                "queue_limit": PASSWORD_QUEUE_LIMIT,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+            }
+            for name, op in self.ops.items():
+                avg = op["total"] / op["count"] if op["count"] else 0.0
+                result[name] = {
+                    "count": op["count"],
+                    "avg_ms": round(avg * 1000, 3),
+                    "max_ms": round(op["max"] * 1000, 3),
+                }
+            return result
+
+
+password_stats = PasswordStats()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            # "spawn" : pas de fork d'un process déjà multi-threadé
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+async def _run(name: str, func, *args):
+    if not _slots.acquire(blocking=False):
+        password_stats.reject()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Authentication service busy, retry later",
+                            headers={"Retry-After": "1"})
+    password_stats.enter()
+    start = time.perf_counter()
+    try:
+        future = _get_executor().submit(func, *args)
+    except BaseException:
+        password_stats.record(name, time.perf_counter() - start)
+        _slots.release()
+        raise
+    # Le slot reste pris jusqu'à la fin (ou l'annulation) du job : PASSWORD_QUEUE_LIMIT
+    # borne aussi les jobs abandonnés après un timeout
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), PASSWORD_TIMEOUT)
+    except asyncio.TimeoutError as exc:
+        future.cancel()  # retire le job s'il attend encore dans la file du pool
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Authentication service busy, retry later",
+                            headers={"Retry-After": "1"}) from exc
+    finally:
+        password_stats.record(name, time.perf_counter() - start)
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", _hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run("verify", _verify, password, hashed)
@@ -0,0 +1,250 @@
+# response_cache.py
+# Cache des réponses GET (list_cellars, get_cellar, list_bottles, get_bottle), déjà
+# sérialisées en JSON : un hit ne touche ni la base ni Pydantic.
+#
+# - Clé : utilisateur + chemin + paramètres de requête.
+# - Chaque entrée retient les versions des « scopes » dont elle dépend
+#   (("cellar", id), ("bottle", id), ("cellars", user_id), et le scope global) ;
+#   les routes d'écriture incrémentent ces versions, ce qui invalide les entrées.
+# - Deux niveaux : LRU en mémoire du process, puis un niveau partagé optionnel
+#   (RESPONSE_CACHE_BACKEND : "memory" pour le stand-in local, ou une URL redis://).
+#   Avec un niveau partagé, les versions y sont aussi stockées (communes aux workers).
+# - Les invalidations arrivent par le bus (invalidation.py), y compris celles des autres
+#   workers.
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from cache import TTLCache
+from etags import not_modified
+from invalidation import ALL, bus
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "")
+
+CACHED_HEADERS = ("etag", "cache-control", "vary", "x-next-cursor", "link")
+GLOBAL_SCOPE = ALL
+
+
+# ---- Niveau partagé ----
+class CacheBackend:
+    """Interface minimale du niveau partagé (valeurs en bytes, compteurs entiers)."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def get_many(self, keys) -> list:
+        return [self.get(key) for key in keys]
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Stand-in local du niveau partagé (tests, process unique)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+
+    def incr(self, key):
+        with self._lock:
+            _, value = self._data.get(key, (None, b"0"))
+            value = str(int(value) + 1).encode()
+            self._data[key] = (None, value)
+            return int(value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend(CacheBackend):
+    """Niveau partagé sur Redis (dépendance optionnelle : pip install redis)."""
+
+    def __init__(self, url: str):
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis:// requires the redis package") from exc
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=int(ttl) or None)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+    def get_many(self, keys):
+        return self._client.mget(keys) if keys else []
+
+    def clear(self):
+        for key in self._client.scan_iter("rc:*"):
+            self._client.delete(key)
+
+
+def make_backend(spec: str) -> Optional[CacheBackend]:
+    if not spec:
+        return None
+    if spec == "memory":
+        return MemoryBackend()
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(spec)
+    raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND: {spec}")
+
+
+# ---- Scopes ----
+def cellar_scope(cellar_id: str):
+    return ("cellar", cellar_id)
+
+
+def bottle_scope(bottle_id: str):
+    return ("bottle", bottle_id)
+
+
+def user_cellars_scope(user_id: int):
+    return ("cellars", user_id)
+
+
+@lru_cache(maxsize=None)
+def _adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def serialize(model, value) -> bytes:
+    """JSON conforme au `response_model` de la route (objets ORM acceptés)."""
+    adapter = _adapter(model)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 shared: Optional[CacheBackend] = None):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        # Versions des scopes : dans le niveau partagé s'il existe, sinon dans le process
+        self._versions = shared or MemoryBackend()
+        self.shared_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.local.maxsize > 0 or self.shared is not None
+
+    @staticmethod
+    def _key(request: Request, user) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"rc:{user.id}:{request.url.path}?{query}"
+
+    @staticmethod
+    def _scope_key(scope) -> str:
+        return f"rc:v:{scope[0]}:{scope[1]}"
+
+    def versions(self, scopes) -> list:
+        values = self._versions.get_many([self._scope_key(s) for s in scopes])
+        return [int(v) if v is not None else 0 for v in values]
+
+    def _valid(self, deps) -> bool:
+        scopes = [tuple(scope) for scope, _ in deps]
+        return self.versions(scopes) == [version for _, version in deps]
+
+    def lookup(self, request: Request, user, *scopes):
+        """Retourne `(réponse, jeton)`. Sans hit, la réponse vaut None et le jeton, qui fige
+        les versions des scopes lues AVANT la base, est à repasser à `store`."""
+        scopes = (GLOBAL_SCOPE,) + scopes
+        token = {"key": self._key(request, user),
+                 "deps": [[list(s), v] for s, v in zip(scopes, self.versions(scopes))]}
+        if not self.enabled:
+            return None, token
+
+        entry = self.local.get(token["key"])
+        from_shared = False
+        if entry is None and self.shared is not None:
+            raw = self.shared.get(token["key"])
+            if raw is not None:
+                head, body = raw.split(b"\n", 1)
+                entry = {**json.loads(head), "body": body}
+                from_shared = True
+                self.shared_hits += 1
+        if entry is None or not self._valid(entry["deps"]):
+            return None, token
+        if from_shared:
+            self.local.set(token["key"], entry)
+
+        etag = entry["headers"].get("etag")
+        if etag and not_modified(request, etag):
+            return Response(status_code=304, headers=entry["headers"]), token
+        return Response(content=entry["body"], media_type="application/json",
+                         headers=entry["headers"]), token
+
+    def store(self, token: dict, body: bytes, response: Response, *late_scopes) -> Response:
+        """Met en cache le JSON `body` (avec les en-têtes posés sur `response`) et le retourne.
+
+        `late_scopes` : scopes découverts en lisant la base (leur version est lue maintenant).
+        """
+        headers = {k: v for k, v in response.headers.items() if k in CACHED_HEADERS}
+        if self.enabled:
+            deps = token["deps"] + [[list(s), v] for s, v
+                                    in zip(late_scopes, self.versions(late_scopes))]
+            entry = {"headers": headers, "deps": deps, "body": body}
+            self.local.set(token["key"], entry)
+            if self.shared is not None:
+                head = json.dumps({"headers": headers, "deps": deps}).encode()
+                self.shared.set(token["key"], head + b"\n" + body, self.ttl)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *scopes):
+        for scope in scopes:
+            self._versions.incr(self._scope_key(scope))
+
+    def clear(self):
+        self.invalidate(GLOBAL_SCOPE)
+        self.local.clear()
+
+    def apply(self, entity, entity_id, remote: bool):
+        """Handler du bus d'invalidation."""
+        if remote and self.shared is not None:
+            return  # versions partagées : déjà incrémentées par le worker émetteur
+        if (entity, entity_id) == GLOBAL_SCOPE:
+            self.clear()
+        else:
+            self.invalidate((entity, entity_id))
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), "shared": type(self.shared).__name__ if self.shared else None,
+                "shared_hits": self.shared_hits}
+
+
+response_cache = ResponseCache(shared=make_backend(RESPONSE_CACHE_BACKEND))
+bus.subscribe(("cellar", "bottle", "cellars", ALL[0]), response_cache.apply)
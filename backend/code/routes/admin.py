@@ -1,21 +1,24 @@
 # routes/admin.py
 import os
 import logging
+from typing import Optional
 from fastapi import APIRouter, Depends, status, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from passlib.context import CryptContext
 from dotenv import load_dotenv
 
 from models import User, WineCellar, WineBottle, Permission
-from dependencies import API_PATH_ROOT, get_db
+from dependencies import API_PATH_ROOT, get_db, get_async_db, admin_required
+from invalidation import ALL, publish
+from counters import recompute_counters
+from passwords import hash_password
 # import schemas
 
 # prefix="/admin",
 router = APIRouter(prefix=API_PATH_ROOT, tags=["admin"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 load_dotenv()
 
 @router.get("/clean", status_code=status.HTTP_201_CREATED)
@@ -26,6 +29,7 @@ def clean_database(db: Session = Depends(get_db)):
         db.query(Permission).delete()
         db.query(User).delete()
         db.commit()
+        publish(ALL)
     except Exception as e:
         logging.exception("Unexpected error while cleaning database: %s", e)
         db.rollback()
@@ -33,7 +37,7 @@ def clean_database(db: Session = Depends(get_db)):
     return {"detail": "Database cleaned"}
 
 @router.get("/init", status_code=status.HTTP_201_CREATED)
-def init_database(db: Session = Depends(get_db)):
+async def init_database(db: AsyncSession = Depends(get_async_db)):
     # Récupérer les informations d'admin depuis les variables d'environnement
     name = os.getenv("ADMIN_NAME", "admin@example.com")
     username = os.getenv("ADMIN_USERNAME", "admin")
@@ -41,31 +45,35 @@ def init_database(db: Session = Depends(get_db)):
 
     try:
         # Vérifier si un admin existe déjà
-        existing_admin = db.query(User).filter(User.is_admin).first() # == True
+        existing_admin = await db.scalar(select(User).where(User.is_admin)) # == True
         if existing_admin:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail="Admin already exists")
 
         # Hasher le mot de passe et créer l'utilisateur admin
-        hashed_password = pwd_context.hash(password[:72])
+        await db.rollback()  # rend la connexion au pool pendant bcrypt
+        hashed_password = await hash_password(password[:72])
         user = User(email=name, username=username, hashed_password=hashed_password, is_admin=True)
 
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+    except HTTPException:
+        await db.rollback()
+        raise
     except IntegrityError as exc:
         logging.warning("Integrity error while creating admin: %s", exc)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Admin already exists or data integrity issue") from exc
     except SQLAlchemyError as exc:
         logging.warning("Database error while creating admin: %s", exc)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Database error") from exc
     except Exception as exc:
         logging.exception("Unexpected error while creating admin: %s", exc)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Unexpected error") from exc
 
@@ -80,4 +88,16 @@ def home(db: Session = Depends(get_db)):
     db.query(Permission).delete()
     db.query(User).delete()
     db.commit()
+    publish(ALL)
     return {"detail": "Hello World!"}
+
+
+@router.post("/admin/repair-counters")
+def repair_counters(cellar_id: Optional[str] = None, db: Session = Depends(get_db),
+                    current_user: User = Depends(admin_required)):
+    # Recalcule bottle_count / total_quantity / total_value depuis wine_bottles
+    result = db.execute(recompute_counters(cellar_id))
+    db.commit()
+    publish(ALL)
+    logging.info("Cellar counters recomputed by %s: %s cellars", current_user.id, result.rowcount)
+    return {"detail": "Counters recomputed", "cellars": result.rowcount}
@@ -1,18 +1,56 @@
 # routes/bottles.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+import io
+import json
+import os
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 # from database import session_local
 # import traceback
 
 import models
 import schemas
-from dependencies import API_PATH_ROOT, get_db, get_current_user
-from database import logger
+from dependencies import (API_PATH_ROOT, get_db, get_async_db, get_read_db, get_current_user,
+                          fetch_owned_bottle, fetch_owned_cellar, owned_bottle,
+                          owned_bottle_rows_stmt, owned_bottles_stmt, owned_cellar,
+                          owned_cellar_async)
+from database import logger, get_db_session, get_db_engine
+from fulltext import fulltext_search
+from counters import bottle_quantity, bottle_value, cellar_delta, cellar_versions
+from etags import check_etag, make_etag
+from pagination import PageParams, keyset, paginate
+from invalidation import publish
+from response_cache import (bottle_scope, cellar_scope, response_cache, serialize,
+                            user_cellars_scope)
+from serialization import (BOTTLES, CELLAR_NAME, MY_BOTTLES, RowSerializer, dumps,
+                           fields_param, json_response)
 # from Playwright_vinvino import scrape_vivino_info
 
 router = APIRouter(prefix=API_PATH_ROOT , tags=["Wine Bottles"])
 
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FIELDS = list(schemas.WineBottleOut.model_fields)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+
+def _bottle_events(bottle: models.WineBottle, versions: dict):
+    """Événements d'invalidation d'une écriture sur `bottle` (cave jointe chargée).
+
+    `versions` : cellar_id -> version de la cave après l'écriture (cellar_versions) ;
+    chaque écriture sur une bouteille incrémente celle de sa cave.
+    """
+    version = versions[bottle.cellar_id]
+    return (bottle_scope(bottle.id) + (version,), cellar_scope(bottle.cellar_id) + (version,),
+            user_cellars_scope(bottle.cellar.user_id))
+
 
 # @router.post("/cellars/{cellar_id}/bottles", response_model=schemas.WineBottleOut,
 #       status_code=status.HTTP_201_CREATED)
@@ -46,30 +84,14 @@ router = APIRouter(prefix=API_PATH_ROOT , tags=["Wine Bottles"])
 def add_bottle(
     cellar_id: str,
     payload: schemas.WineBottleCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    cellar: models.WineCellar = Depends(owned_cellar),
+    db: Session = Depends(get_db)
 ):
 
     logger.info("---- ADD BOTTLE START ----")
     logger.info(f"Received payload: {payload.model_dump()}")
     logger.info(f"scrape flag received = {payload.scrape} (type: {type(payload.scrape)})")
 
-    # Vérification cave
-    logger.info(f"Checking cellar_id: {cellar_id}")
-    cellar = (
-        db.query(models.WineCellar)
-        .filter(models.WineCellar.id == cellar_id)
-        .first()
-    )
-    if not cellar:
-        logger.error("❌ Cave à vin non trouvée.")
-        raise HTTPException(status_code=404, detail="Cave à vin non trouvée")
-
-    # Vérification utilisateur
-    if cellar.user_id != current_user.id and not current_user.is_admin:  # type: ignore
-        logger.warning(f"User {current_user.id} is not owner of cellar {cellar_id}")
-        raise HTTPException(status_code=403, detail="Forbidden")
-
     scraped = None
 
     # LOG : vérifier si scrape vaut False
@@ -126,16 +148,26 @@ def add_bottle(
         region=get_field(payload.region, scraped["wine_facts"].get("Région") if scraped else None),
         country=get_field(payload.country, country_fallback),
         price=get_field(payload.price, price_fallback),
-        quantity=payload.quantity or 1,
+        quantity=bottle_quantity(payload.quantity),
         image_url=get_field(payload.image_url, scraped.get("image_url") if scraped else None),
         notes=get_field(payload.notes, scraped.get("description") if scraped else None),
     )
 
     logger.info(f"Final bottle object: {bottle}")
 
+    quantity = bottle_quantity(bottle.quantity)
+    reserved = db.execute(cellar_delta(cellar_id, 1, quantity, bottle_value(bottle.price, quantity),
+                                       check_capacity=True))
+    if reserved.rowcount == 0:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Capacité de la cave dépassée")
+
     db.add(bottle)
+    version = db.execute(cellar_versions([cellar_id])).one().version
+    events = (cellar_scope(cellar_id) + (version,), user_cellars_scope(cellar.user_id))
     logger.info("Bottle added to session, committing...")
     db.commit()
+    publish(*events)
 
     logger.info("Commit OK. Refreshing bottle...")
     db.refresh(bottle)
@@ -146,65 +178,476 @@ def add_bottle(
 
 
 
+async def _iter_lines(request: Request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig")
+    if buffer:
+        yield buffer.decode("utf-8-sig")
+
+
+async def _iter_ndjson(request: Request):
+    async for line in _iter_lines(request):
+        if line.strip():
+            yield json.loads(line)
+
+
+async def _iter_csv(request: Request):
+    header = None
+    delimiter = ","
+    record = ""
+    async for line in _iter_lines(request):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue  # champ entre guillemets sur plusieurs lignes
+        if record.strip():
+            if header is None:
+                delimiter = csv.Sniffer().sniff(record, delimiters=",;\t").delimiter
+                header = next(csv.reader([record], delimiter=delimiter))
+            else:
+                values = next(csv.reader([record], delimiter=delimiter))
+                yield {k: (v if v != "" else None) for k, v in zip(header, values)}
+        record = ""
+
+
+async def _iter_json_array(request: Request):
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid JSON body") from exc
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    for row in rows:
+        yield row
+
+
+def _bulk_reader(request: Request):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return _iter_ndjson(request)
+    if content_type in ("text/csv", "application/csv"):
+        return _iter_csv(request)
+    return _iter_json_array(request)
+
+
+@router.post("/cellars/{cellar_id}/bottles:bulk", response_model=schemas.BulkImportOut,
+             status_code=status.HTTP_201_CREATED)
+async def bulk_add_bottles(
+    cellar_id: str,
+    request: Request,
+    strict: bool = False,
+    cellar: models.WineCellar = Depends(owned_cellar_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Import en masse : tableau JSON, NDJSON ou CSV, inséré par lots dans une seule transaction.
+    # Avec strict=true, la moindre ligne invalide annule tout l'import (422).
+
+    inserted = 0
+    errors = []
+    batch = []
+    quantity = 0
+    value = 0.0
+    index = 0
+    try:
+        async for row in _bulk_reader(request):
+            index += 1
+            try:
+                bottle = schemas.WineBottleImport.model_validate(row)
+            except ValidationError as exc:
+                errors.append(schemas.BulkRowError(row=index, errors=[
+                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                    for err in exc.errors()
+                ]))
+                continue
+            batch.append({**bottle.model_dump(), "cellar_id": cellar_id,
+                          "quantity": bottle_quantity(bottle.quantity)})
+            quantity += bottle_quantity(bottle.quantity)
+            value += bottle_value(bottle.price, bottle.quantity)
+            if len(batch) >= BULK_BATCH_SIZE:
+                await db.execute(insert(models.WineBottle), batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            await db.execute(insert(models.WineBottle), batch)
+            inserted += len(batch)
+        reserved = await db.execute(
+            cellar_delta(cellar_id, inserted, quantity, value, check_capacity=True))
+    except (ValueError, csv.Error) as exc:
+        await db.rollback()
+        raise HTTPException(status_code=400,
+                            detail=f"Malformed row {index + 1}: {exc}") from exc
+    except SQLAlchemyError as exc:
+        await db.rollback()
+        logger.error("Database error during bulk import: %s", exc)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail="Internal server error") from exc
+
+    if strict and errors:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail=[e.model_dump() for e in errors])
+    if reserved.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Capacité de la cave dépassée")
+    version = (await db.execute(cellar_versions([cellar_id]))).one().version
+    await db.commit()
+    publish(cellar_scope(cellar_id) + (version,), user_cellars_scope(cellar.user_id))
+
+    logger.info("Bulk import into cellar %s: %s inserted, %s failed",
+                cellar_id, inserted, len(errors))
+    return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+
 @router.get("/cellars/{cellar_id}/bottles", response_model=List[schemas.WineBottleOut])
-def list_bottles(cellar_id: str, db: Session = Depends(get_db),
-                 current_user: models.User = Depends(get_current_user)):
-    cellar = db.query(models.WineCellar).filter(models.WineCellar.id == cellar_id).first()
-    if not cellar:
-        raise HTTPException(status_code=404, detail="Cave à vin non trouvée")
-    if cellar.user_id != current_user.id and not current_user.is_admin: # type: ignore
-        raise HTTPException(status_code=403, detail="Forbidden")
-    bottles = db.query(models.WineBottle).filter(models.WineBottle.cellar_id == cellar_id).all()
-    return bottles
+async def list_bottles(cellar_id: str, request: Request, response: Response,
+                       page: PageParams = Depends(),
+                       projection: RowSerializer = Depends(fields_param(BOTTLES)),
+                       db: AsyncSession = Depends(get_read_db),
+                       current_user: models.User = Depends(get_current_user)):
+    cached, token = response_cache.lookup(request, current_user, cellar_scope(cellar_id))
+    if cached is not None:
+        return cached
+    cellar = await fetch_owned_cellar(db, cellar_id, current_user)
+    # La version de la cave change à chaque écriture sur ses bouteilles
+    not_modified = check_etag(request, response, make_etag(
+        "bottles", cellar_id, cellar.version, page.limit, page.cursor, projection.fields))
+    if not_modified:
+        return not_modified
+    # Lignes Core encodées directement (voir serialization.py)
+    stmt = (projection.select(models.WineBottle.created_at)
+            .where(models.WineBottle.cellar_id == cellar_id))
+    rows = await db.execute(keyset(stmt, models.WineBottle, page))
+    return response_cache.store(
+        token, projection.dumps(paginate(rows, page, request, response)), response)
+
+
+def _export_rows(cellar_id: str):
+    # Session dédiée : elle doit rester ouverte pendant tout le streaming
+    db = get_db_session()
+    try:
+        columns = [models.WineBottle.__table__.c[name] for name in EXPORT_FIELDS]
+        stmt = (
+            select(*columns)
+            .where(models.WineBottle.cellar_id == cellar_id)
+            .order_by(models.WineBottle.created_at, models.WineBottle.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)  # curseur côté serveur
+        )
+        for partition in db.execute(stmt).partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _export_ndjson(cellar_id: str):
+    for partition in _export_rows(cellar_id):
+        yield b"".join(dumps(dict(row._mapping)) + b"\n" for row in partition)
+
+
+def _export_csv(cellar_id: str):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for partition in _export_rows(cellar_id):
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/cellars/{cellar_id}/bottles/export", dependencies=[Depends(owned_cellar_async)])
+async def export_bottles(cellar_id: str,
+                         export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format")):
+    if export_format == "csv":
+        body, media_type = _export_csv(cellar_id), "text/csv"
+    else:
+        body, media_type = _export_ndjson(cellar_id), "application/x-ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="cellar-{cellar_id}.{export_format}"'
+    }
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@router.get("/me/bottles",
+            response_model=Union[List[schemas.CellarBottlesOut], List[schemas.MyBottleOut]])
+async def list_my_bottles(
+    request: Request,
+    response: Response,
+    cellar_id: Optional[List[str]] = Query(None, description="Restreint à ces caves (répétable)"),
+    group_by_cellar: bool = False,
+    page: PageParams = Depends(),
+    projection: RowSerializer = Depends(fields_param(MY_BOTTLES)),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    # Toutes les bouteilles de l'utilisateur, toutes caves confondues, en une seule requête.
+    # Groupées, elles sont triées par cave : un groupe coupé par la pagination reprend
+    # sur la page suivante.
+    sort = models.WineBottle.cellar_id if group_by_cellar else None
+    # Clés de pagination et de regroupement lues même si non demandées
+    stmt = (
+        projection.select(models.WineBottle.created_at, models.WineBottle.cellar_id, CELLAR_NAME)
+        .join(models.WineCellar, models.WineBottle.cellar_id == models.WineCellar.id)
+        .where(models.WineCellar.user_id == current_user.id)
+    )
+    if cellar_id:
+        stmt = stmt.where(models.WineBottle.cellar_id.in_(cellar_id))
+    rows = paginate(await db.execute(keyset(stmt, models.WineBottle, page, sort=sort)),
+                    page, request, response, sort=sort)
+    if not group_by_cellar:
+        return json_response(projection.dumps(rows), response)
+
+    groups = {}
+    for row, bottle in zip(rows, projection.dicts(rows)):
+        bottle.pop("cellar_name", None)
+        group = groups.setdefault(row.cellar_id, {
+            "cellar_id": row.cellar_id, "cellar_name": row.cellar_name, "bottles": []})
+        group["bottles"].append(bottle)
+    return json_response(dumps(list(groups.values())), response)
+
+
+SEARCH_SORTS = {
+    "created_at": models.WineBottle.created_at,
+    "name": models.WineBottle.name,
+    "vintage": models.WineBottle.vintage,
+    "price": models.WineBottle.price,
+}
+
+
+@router.get("/bottles/search", response_model=List[schemas.WineBottleOut])
+async def search_bottles(
+    request: Request,
+    response: Response,
+    q: Optional[str] = Query(None, description="Recherche plein texte (nom, notes, région)"),
+    name: Optional[str] = Query(None, description="Préfixe du nom"),
+    wine_type: Optional[str] = None,
+    region: Optional[str] = None,
+    country: Optional[str] = None,
+    vintage_min: Optional[int] = None,
+    vintage_max: Optional[int] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    cellar_id: Optional[str] = None,
+    sort: Optional[Literal["relevance", "created_at", "name", "vintage", "price"]] = Query(
+        None, description="Par défaut : relevance si q est fourni, sinon created_at"),
+    order: Literal["asc", "desc"] = "asc",
+    page: PageParams = Depends(),
+    projection: RowSerializer = Depends(fields_param(BOTTLES)),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if sort == "relevance" and q is None:
+        raise HTTPException(status_code=400, detail="Le tri par pertinence nécessite q")
+    bottle = models.WineBottle
+    by_relevance = q is not None and sort in (None, "relevance")
+    sort_col = None if by_relevance else SEARCH_SORTS[sort or "created_at"]
+    stmt = (
+        projection.select(*([] if by_relevance else [sort_col]))
+        .join(models.WineCellar, bottle.cellar_id == models.WineCellar.id)
+        .where(models.WineCellar.user_id == current_user.id)
+    )
+    if cellar_id is not None:
+        stmt = stmt.where(bottle.cellar_id == cellar_id)
+    if name:
+        stmt = stmt.where(bottle.name.startswith(name, autoescape=True))
+    if wine_type is not None:
+        stmt = stmt.where(bottle.wine_type == wine_type)
+    if region is not None:
+        stmt = stmt.where(bottle.region == region)
+    if country is not None:
+        stmt = stmt.where(bottle.country == country)
+    if vintage_min is not None:
+        stmt = stmt.where(bottle.vintage >= vintage_min)
+    if vintage_max is not None:
+        stmt = stmt.where(bottle.vintage <= vintage_max)
+    if price_min is not None:
+        stmt = stmt.where(bottle.price >= price_min)
+    if price_max is not None:
+        stmt = stmt.where(bottle.price <= price_max)
+
+    descending = order == "desc"
+    if q is not None:
+        stmt, score, best_first_desc = fulltext_search(stmt, q, get_db_engine().dialect.name)
+        if by_relevance:
+            # la colonne score (valeur du curseur suivant) n'est pas sérialisée
+            stmt, sort_col, descending = stmt.add_columns(score), score, best_first_desc
+    rows = await db.execute(keyset(stmt, bottle, page, sort=sort_col, descending=descending))
+    return json_response(
+        projection.dumps(paginate(rows, page, request, response, sort=sort_col)), response)
 
 
 @router.get("/bottles/{bottle_id}", response_model=schemas.WineBottleOut)
-def get_bottle(bottle_id: str, db: Session = Depends(get_db),
-               current_user: models.User = Depends(get_current_user)):
-    bottle = db.query(models.WineBottle).filter(models.WineBottle.id == bottle_id).first()
-    if not bottle:
-        raise HTTPException(status_code=404, detail="Bouteille non trouvée")
-    cellar = bottle.cellar
-    if cellar.user_id != current_user.id and not current_user.is_admin: # type: ignore
-        raise HTTPException(status_code=403, detail="Forbidden")
-    return bottle
+async def get_bottle(bottle_id: str, request: Request, response: Response,
+                     db: AsyncSession = Depends(get_read_db),
+                     current_user: models.User = Depends(get_current_user)):
+    # L'ETag suit la version de la cave : toute écriture dans les caves de l'utilisateur
+    # invalide l'entrée (la cave, inconnue avant lecture, s'y ajoute pour un admin)
+    cached, token = response_cache.lookup(request, current_user, bottle_scope(bottle_id),
+                                          user_cellars_scope(current_user.id))
+    if cached is not None:
+        return cached
+    bottle = await fetch_owned_bottle(db, bottle_id, current_user)
+    not_modified = check_etag(request, response, make_etag(
+        "bottle", bottle.id, bottle.cellar.version, bottle.updated_at))
+    if not_modified:
+        return not_modified
+    return response_cache.store(token, serialize(schemas.WineBottleOut, bottle), response,
+                                cellar_scope(bottle.cellar_id))
 
 
 @router.put("/bottles/{bottle_id}", response_model=schemas.WineBottleOut)
 def update_bottle(
-    bottle_id: str,
     payload: schemas.WineBottleUpdate,  # tous les champs optionnels
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    bottle: models.WineBottle = Depends(owned_bottle),
+    db: Session = Depends(get_db)
 ):
-    bottle = db.query(models.WineBottle).filter(models.WineBottle.id == bottle_id).first()
-    if not bottle:
-        raise HTTPException(status_code=404, detail="Bouteille non trouvée")
-
-    cellar = db.query(models.WineCellar).filter(models.WineCellar.id == bottle.cellar_id).first()
-    if not cellar or (cellar.user_id != current_user.id and
-                      not current_user.is_admin): # type: ignore
-        raise HTTPException(status_code=403, detail="Forbidden")
+    old_quantity = bottle_quantity(bottle.quantity)
+    old_value = bottle_value(bottle.price, bottle.quantity)
 
     # Mets à jour uniquement les champs fournis
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(bottle, field, value)
 
+    try:
+        db.flush()
+    except StaleDataError as exc:
+        # supprimée entre-temps (SQLite ignore FOR UPDATE)
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Bouteille non trouvée") from exc
+
+    delta_quantity = bottle_quantity(bottle.quantity) - old_quantity
+    delta_value = bottle_value(bottle.price, bottle.quantity) - old_value
+    updated = db.execute(cellar_delta(bottle.cellar_id, 0, delta_quantity, delta_value,
+                                      check_capacity=True))
+    if updated.rowcount == 0:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Capacité de la cave dépassée")
+
+    events = _bottle_events(bottle, dict(db.execute(cellar_versions([bottle.cellar_id])).all()))
     db.commit()
+    publish(*events)
     db.refresh(bottle)
     return bottle
 
 
 @router.delete("/bottles/{bottle_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_bottle(bottle_id: str, db: Session = Depends(get_db),
-                  current_user: models.User = Depends(get_current_user)):
-    bottle = db.query(models.WineBottle).filter(models.WineBottle.id == bottle_id).first()
-    if not bottle:
-        raise HTTPException(status_code=404, detail="Bouteille non trouvée")
-    cellar = bottle.cellar
-    if cellar.user_id != current_user.id and not current_user.is_admin: # type: ignore
-        raise HTTPException(status_code=403, detail="Forbidden")
+def delete_bottle(bottle: models.WineBottle = Depends(owned_bottle),
+                  db: Session = Depends(get_db)):
+    db.execute(cellar_delta(bottle.cellar_id, -1, -bottle_quantity(bottle.quantity),
+                            -bottle_value(bottle.price, bottle.quantity)))
+    events = _bottle_events(bottle, dict(db.execute(cellar_versions([bottle.cellar_id])).all()))
     db.delete(bottle)
     db.commit()
+    publish(*events)
     # return None
+
+
+# ---- Opérations par lot ----
+# Propriété résolue en une requête pour tous les ids, puis une seule transaction ;
+# chaque élément a son propre statut (200 / 204, 404 si absent ou pas à l'utilisateur).
+def _check_batch_size(count: int):
+    if count > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400,
+                            detail=f"Trop d'éléments dans le lot (max {BATCH_MAX_ITEMS})")
+
+
+@router.get("/bottles", response_model=List[schemas.WineBottleOut])
+async def get_bottles(ids: str = Query(..., description="Identifiants séparés par des virgules"),
+                      projection: RowSerializer = Depends(fields_param(BOTTLES)),
+                      db: AsyncSession = Depends(get_read_db),
+                      current_user: models.User = Depends(get_current_user)):
+    wanted = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    _check_batch_size(len(wanted))
+    found = {row.id: row for row in await db.execute(owned_bottle_rows_stmt(
+        current_user, projection.select(), models.WineBottle.id.in_(wanted)))}
+    # ordre de la requête, ids inconnus omis
+    return json_response(projection.dumps(found[i] for i in wanted if i in found))
+
+
+@router.patch("/bottles", response_model=schemas.BatchResultOut)
+def update_bottles(payload: List[schemas.WineBottleBatchUpdate], db: Session = Depends(get_db),
+                   current_user: models.User = Depends(get_current_user)):
+    _check_batch_size(len(payload))
+    found = {bottle.id: bottle for bottle in db.scalars(
+        owned_bottles_stmt(current_user, models.WineBottle.id.in_([i.id for i in payload]))
+        .with_for_update(of=models.WineBottle))}
+
+    results = []
+    deltas = {}  # cellar_id -> [quantité, valeur]
+    for item in payload:
+        bottle = found.get(item.id)
+        if bottle is None:
+            results.append({"id": item.id, "status": 404, "detail": "Bouteille non trouvée"})
+            continue
+        old_quantity = bottle_quantity(bottle.quantity)
+        old_value = bottle_value(bottle.price, bottle.quantity)
+        for field, value in item.model_dump(exclude_unset=True, exclude={"id"}).items():
+            setattr(bottle, field, value)
+        delta = deltas.setdefault(bottle.cellar_id, [0, 0.0])
+        delta[0] += bottle_quantity(bottle.quantity) - old_quantity
+        delta[1] += bottle_value(bottle.price, bottle.quantity) - old_value
+        results.append({"id": item.id, "status": 200, "bottle": bottle})
+
+    # Cave pleine : ses modifications sont abandonnées (expire avant le flush)
+    full = set()
+    for cellar_id, (quantity, value) in deltas.items():
+        updated = db.execute(cellar_delta(cellar_id, 0, quantity, value, check_capacity=True))
+        if updated.rowcount == 0:
+            full.add(cellar_id)
+    versions = dict(db.execute(cellar_versions(deltas)).all()) if deltas else {}
+    events = {event for bottle in found.values() for event in _bottle_events(bottle, versions)}
+    for result in results:
+        bottle = result.get("bottle")
+        if bottle is not None and bottle.cellar_id in full:
+            db.expire(bottle)
+            result.update(status=400, detail="Capacité de la cave dépassée", bottle=None)
+
+    try:
+        db.flush()
+    except StaleDataError as exc:
+        db.rollback()
+        raise HTTPException(status_code=409,
+                            detail="Bouteille modifiée ou supprimée entre-temps") from exc
+    db.commit()
+    publish(*events)
+    # Recharge en une requête les bouteilles expirées par le commit
+    updated_ids = [r["id"] for r in results if r.get("bottle") is not None]
+    if updated_ids:
+        db.scalars(select(models.WineBottle).where(models.WineBottle.id.in_(updated_ids))).all()
+
+    succeeded = sum(1 for r in results if r["status"] == 200)
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+@router.post("/bottles:batchDelete", response_model=schemas.BatchResultOut)
+def delete_bottles(payload: schemas.BatchDeleteIn, db: Session = Depends(get_db),
+                   current_user: models.User = Depends(get_current_user)):
+    wanted = list(dict.fromkeys(payload.ids))
+    _check_batch_size(len(wanted))
+    found = {bottle.id: bottle for bottle in db.scalars(
+        owned_bottles_stmt(current_user, models.WineBottle.id.in_(wanted))
+        .with_for_update(of=models.WineBottle))}
+
+    deltas = {}  # cellar_id -> [bouteilles, quantité, valeur]
+    for bottle in found.values():
+        delta = deltas.setdefault(bottle.cellar_id, [0, 0, 0.0])
+        delta[0] -= 1
+        delta[1] -= bottle_quantity(bottle.quantity)
+        delta[2] -= bottle_value(bottle.price, bottle.quantity)
+    for cellar_id, (count, quantity, value) in deltas.items():
+        db.execute(cellar_delta(cellar_id, count, quantity, value))
+    versions = dict(db.execute(cellar_versions(deltas)).all()) if deltas else {}
+    events = {event for bottle in found.values() for event in _bottle_events(bottle, versions)}
+    if found:
+        db.execute(delete(models.WineBottle).where(models.WineBottle.id.in_(list(found)))
+                   .execution_options(synchronize_session=False))
+    db.commit()
+    publish(*events)
+
+    results = [{"id": i, "status": 204} if i in found else
+               {"id": i, "status": 404, "detail": "Bouteille non trouvée"} for i in wanted]
+    return {"succeeded": len(found), "failed": len(wanted) - len(found), "results": results}
@@ -1,13 +1,19 @@
 # routes/cellars.py
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
 
+import cascades
 import models
 import schemas
-from dependencies import API_PATH_ROOT, get_db, get_current_user
-from database import logger
+from dependencies import (API_PATH_ROOT, get_db, get_read_db, get_current_user,
+                          fetch_owned_cellar, owned_cellar, owned_cellar_async)
+from pagination import PageParams, keyset, paginate
+from etags import check_etag, make_etag
+from invalidation import publish
+from response_cache import cellar_scope, response_cache, serialize, user_cellars_scope
 
 router = APIRouter(prefix=f"{API_PATH_ROOT}/cellars", tags=["Wine Cellars"])
 
@@ -20,64 +26,112 @@ def create_cellar(payload: schemas.WineCellarCreate, db: Session = Depends(get_d
     db.add(cellar)
     db.commit()
     db.refresh(cellar)
+    publish(user_cellars_scope(current_user.id))
     return cellar
 
 
 @router.get("", response_model=List[schemas.WineCellarOut])
-def list_cellars(db: Session = Depends(get_db),
-                 current_user: models.User = Depends(get_current_user)):
-    cellars = db.query(models.WineCellar).filter(models.WineCellar.user_id == current_user.id).all()
-    return cellars
+async def list_cellars(request: Request, response: Response,
+                       page: PageParams = Depends(),
+                       db: AsyncSession = Depends(get_read_db),
+                       current_user: models.User = Depends(get_current_user)):
+    cached, token = response_cache.lookup(request, current_user,
+                                          user_cellars_scope(current_user.id))
+    if cached is not None:
+        return cached
+    stmt = select(models.WineCellar).where(models.WineCellar.user_id == current_user.id)
+    cellars = paginate(await db.scalars(keyset(stmt, models.WineCellar, page)),
+                       page, request, response)
+    not_modified = check_etag(request, response, make_etag(
+        "cellars", page.limit, page.cursor, *((c.id, c.version) for c in cellars)))
+    if not_modified:
+        return not_modified
+    return response_cache.store(token, serialize(List[schemas.WineCellarOut], cellars), response)
+
+
+async def _bottle_stats(db: AsyncSession, scope) -> dict:
+    bottle = models.WineBottle
+    quantity = func.coalesce(bottle.quantity, 1)
+    metrics = (
+        func.count(bottle.id),
+        func.coalesce(func.sum(quantity), 0),
+        func.coalesce(func.sum(func.coalesce(bottle.price, 0) * quantity), 0),
+    )
+
+    async def grouped(key):
+        rows = await db.execute(scope(select(key, *metrics)).group_by(key).order_by(key))
+        # MySQL renvoie des Decimal pour SUM()
+        return [{"key": k, "bottles": n, "quantity": int(q), "total_value": round(float(v), 2)}
+                for k, n, q, v in rows]
+
+    totals = (await db.execute(scope(select(*metrics)))).one()
+    return {
+        "bottles": totals[0],
+        "quantity": int(totals[1]),
+        "total_value": round(float(totals[2]), 2),
+        "by_wine_type": await grouped(bottle.wine_type),
+        "by_decade": await grouped((bottle.vintage - bottle.vintage % 10).label("decade")),
+        "by_country": await grouped(bottle.country),
+        "by_region": await grouped(bottle.region),
+    }
+
+
+@router.get("/stats", response_model=schemas.CellarStatsOut)
+async def user_stats(db: AsyncSession = Depends(get_read_db),
+                     current_user: models.User = Depends(get_current_user)):
+    def scope(stmt):
+        return (stmt.select_from(models.WineBottle)
+                .join(models.WineCellar, models.WineBottle.cellar_id == models.WineCellar.id)
+                .where(models.WineCellar.user_id == current_user.id))
+    return await _bottle_stats(db, scope)
+
+
+@router.get("/{cellar_id}/stats", response_model=schemas.CellarStatsOut)
+async def cellar_stats(cellar: models.WineCellar = Depends(owned_cellar_async),
+                       db: AsyncSession = Depends(get_read_db)):
+    def scope(stmt):
+        return stmt.where(models.WineBottle.cellar_id == cellar.id)
+    return {"cellar_id": cellar.id, **await _bottle_stats(db, scope)}
 
 
 @router.get("/{cellar_id}", response_model=schemas.WineCellarOut)
-def get_cellar(cellar_id: str, db: Session = Depends(get_db),
-               current_user: models.User = Depends(get_current_user)):
-    try:
-        cellar = db.query(models.WineCellar).filter(models.WineCellar.id == cellar_id).first()
-        print("Cellar info")
-        if not cellar:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail="Cave à vin non trouvée")
-        if cellar.user_id != current_user.id and not current_user.is_admin:# type: ignore[operator]
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-
-        return cellar
-    except SQLAlchemyError as exc:
-        logger.error(f"Database error while fetching cellar: {exc}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                            detail="Internal server error") from exc
+async def get_cellar(cellar_id: str, request: Request, response: Response,
+                     db: AsyncSession = Depends(get_read_db),
+                     current_user: models.User = Depends(get_current_user)):
+    # Propriété vérifiée après le cache : un hit ne touche pas la base
+    cached, token = response_cache.lookup(request, current_user, cellar_scope(cellar_id))
+    if cached is not None:
+        return cached
+    cellar = await fetch_owned_cellar(db, cellar_id, current_user)
+    not_modified = check_etag(request, response, make_etag("cellar", cellar.id, cellar.version))
+    if not_modified:
+        return not_modified
+    return response_cache.store(token, serialize(schemas.WineCellarOut, cellar), response)
 
 
 @router.put("/{cellar_id}", response_model=schemas.WineCellarOut)
-def update_cellar(cellar_id: str, payload: schemas.WineCellarUpdate,
-                  db: Session = Depends(get_db),
-                  current_user: models.User = Depends(get_current_user)):
-    cellar = db.query(models.WineCellar).filter(models.WineCellar.id == cellar_id).first()
-    if not cellar:
-        raise HTTPException(status_code=404, detail="Cave à vin non trouvée")
-    if cellar.user_id != current_user.id and not current_user.is_admin: # type: ignore
-        raise HTTPException(status_code=403, detail="Forbidden")
+def update_cellar(payload: schemas.WineCellarUpdate,
+                  cellar: models.WineCellar = Depends(owned_cellar),
+                  db: Session = Depends(get_db)):
     if payload.name is not None:
         cellar.name = payload.name # type: ignore
     if payload.location is not None:
         cellar.location = payload.location # type: ignore
     if payload.capacity is not None:
         cellar.capacity = payload.capacity # type: ignore
+    cellar.version = models.WineCellar.version + 1 # type: ignore
     db.add(cellar)
     db.commit()
     db.refresh(cellar)
+    publish(cellar_scope(cellar.id) + (cellar.version,), user_cellars_scope(cellar.user_id))
     return cellar
 
 
 @router.delete("/{cellar_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_cellar(cellar_id: str, db: Session = Depends(get_db),
-                  current_user: models.User = Depends(get_current_user)):
-    cellar = db.query(models.WineCellar).filter(models.WineCellar.id == cellar_id).first()
-    if not cellar:
-        raise HTTPException(status_code=404, detail="Cave à vin non trouvée")
-    if cellar.user_id != current_user.id and not current_user.is_admin: # type: ignore
-        raise HTTPException(status_code=403, detail="Forbidden")
-    db.delete(cellar)
+def delete_cellar(cellar: models.WineCellar = Depends(owned_cellar),
+                  db: Session = Depends(get_db)):
+    scopes = (cellar_scope(cellar.id), user_cellars_scope(cellar.user_id))
+    cascades.delete_cellar(db, cellar.id)
     db.commit()
+    publish(*scopes)
     # return None
@@ -0,0 +1,26 @@
+# routes/debug.py
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query
+
+import models
+from database import N_PLUS_ONE_THRESHOLD, SLOW_QUERY_MS, query_log
+from dependencies import API_PATH_ROOT, admin_required
+
+router = APIRouter(prefix=f"{API_PATH_ROOT}/debug", tags=["Debug"])
+
+
+@router.get("/queries")
+def debug_queries(kind: Optional[Literal["slow", "n_plus_one"]] = None,
+                  limit: int = Query(50, ge=1, le=1000),
+                  current_user: models.User = Depends(admin_required)):  # pylint: disable=unused-argument
+    return {
+        "slow_query_ms": SLOW_QUERY_MS,
+        "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+        "counts": dict(query_log.counts),
+        "events": query_log.snapshot(kind)[:limit],
+    }
+
+
+@router.delete("/queries", status_code=204)
+def clear_queries(current_user: models.User = Depends(admin_required)):  # pylint: disable=unused-argument
+    query_log.clear()
@@ -0,0 +1,29 @@
+# routes/health.py
+from fastapi import APIRouter, Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import get_pool_status
+from dependencies import API_PATH_ROOT, get_db, user_cache
+from invalidation import bus
+from passwords import password_stats
+from response_cache import response_cache
+
+router = APIRouter(prefix=f"{API_PATH_ROOT}/health", tags=["Health"])
+
+
+@router.get("/db")
+def health_db(db: Session = Depends(get_db)):
+    db.execute(text("SELECT 1"))
+    return {"status": "ok", **get_pool_status()}
+
+
+@router.get("/cache")
+def health_cache():
+    return {"users": user_cache.stats(), "responses": response_cache.stats(),
+            "invalidation": bus.stats()}
+
+
+@router.get("/passwords")
+def health_passwords():
+    return password_stats.snapshot()
@@ -0,0 +1,14 @@
+# routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from dependencies import API_PATH_ROOT
+from metrics import registry
+
+router = APIRouter(prefix=API_PATH_ROOT, tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(registry.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,6 @@
 # routes/permissions.py
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 # from database import session_local
 import models
@@ -8,14 +8,18 @@ import schemas
 from dependencies import API_PATH_ROOT
 
 from dependencies import get_db, admin_required
+from pagination import PageParams, keyset, paginate
 
 router = APIRouter(prefix=f"{API_PATH_ROOT}/permissions", tags=["Permissions"])
 
 
 @router.get("", response_model=List[schemas.PermissionOut])
-def list_permissions(db: Session = Depends(get_db),
+def list_permissions(request: Request, response: Response,
+                     page: PageParams = Depends(),
+                     db: Session = Depends(get_db),
                      current_user: models.User = Depends(admin_required)):
-    perms = db.query(models.Permission).all()
+    perms = paginate(keyset(db.query(models.Permission), models.Permission, page),
+                     page, request, response)
     print(current_user)
     return perms
 
@@ -1,82 +1,97 @@
 # routes/tokens.py
 import os
 import uuid
+import hashlib
+import logging
 from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 import jwt
-from passlib.context import CryptContext
 
 from database import get_db
 import models
 import schemas
-from dependencies import API_PATH_ROOT
+from dependencies import API_PATH_ROOT, get_async_db
+from passwords import verify_password
 
 
 router = APIRouter(prefix=f"{API_PATH_ROOT}/tokens", tags=["Tokens"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 JWT_SECRET = os.getenv("JWT_SECRET", "change_me_super_secret")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+TOKEN_SWEEP_BATCH = int(os.getenv("TOKEN_SWEEP_BATCH", "1000"))
+
+
+def hash_jti(jti: str) -> str:
+    return hashlib.sha256(jti.encode()).hexdigest()
+
 
 class TokenRequest(BaseModel):
     email: str
     password: str
 
 @router.post("", response_model=schemas.TokenOut, status_code=status.HTTP_201_CREATED)
-def create_token(payload: TokenRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == payload.email).first()
+async def create_token(payload: TokenRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == payload.email))
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials 1")
 
-    if not pwd_context.verify(payload.password, user.hashed_password):  # type: ignore
+    user_id, hashed = user.id, user.hashed_password
+    # Rend la connexion au pool pendant bcrypt (le job peut attendre dans la file)
+    await db.rollback()
+    if not await verify_password(payload.password, hashed):  # type: ignore
         raise HTTPException(status_code=401, detail="Invalid credentials 2")
 
     now = datetime.utcnow()
 
     # Supprimer les anciens tokens de ce user
-    db.query(models.Token).filter(models.Token.user_id == user.id).delete()
+    await db.execute(delete(models.Token).where(models.Token.user_id == user_id))
 
     access_payload = {
-        "sub": str(user.id),
+        "sub": str(user_id),
         "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
         "type": "access",
     }
     access_token = jwt.encode(access_payload, JWT_SECRET, algorithm="HS256")
 
+    jti = str(uuid.uuid4())  # Ajoute un identifiant unique
     refresh_payload = {
-        "sub": str(user.id),
+        "sub": str(user_id),
         "exp": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
         "type": "refresh",
-        "jti": str(uuid.uuid4()),  # Ajoute un identifiant unique
+        "jti": jti,
     }
     refresh_tokene = jwt.encode(refresh_payload, JWT_SECRET, algorithm="HS256")
 
     token_row = models.Token(
-        user_id=user.id,
-        refresh_token=refresh_tokene,
+        user_id=user_id,
+        jti_hash=hash_jti(jti),
         expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
     db.add(token_row)
 
     try:
-        db.commit()
+        await db.flush()
+        # Lu avant le commit : une connexion concurrente du même user peut supprimer la ligne
+        result = {
+            "id": token_row.id,
+            "user_id": user_id,
+            "token": access_token,
+            "refresh_token": refresh_tokene,
+            "expires_at": token_row.expires_at,
+            "created_at": token_row.created_at,
+        }
+        await db.commit()
     except IntegrityError as exc:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Token déjà existant") from exc
 
-    db.refresh(token_row)
-
-    return {
-        "id": token_row.id,
-        "user_id": user.id,
-        "token": access_token,
-        "expires_at": token_row.expires_at,
-        "created_at": token_row.created_at,
-    }
+    return result
 
 
 class RefreshRequest(BaseModel):
@@ -85,23 +100,30 @@ class RefreshRequest(BaseModel):
 
 @router.post("/refresh", response_model=schemas.TokenOut)
 def refresh_token(payload: RefreshRequest, db: Session = Depends(get_db)):
-    # Validate refresh token existence in DB
-    token_row = db.query(models.Token).filter(
-        models.Token.refresh_token == payload.refresh_token).first()
-    if not token_row:
-        raise HTTPException(status_code=401, detail="Invalid refresh token")
-
+    # Signature vérifiée avant tout accès à la base
     try:
         decoded = jwt.decode(payload.refresh_token, JWT_SECRET, algorithms=["HS256"])
-        print(decoded)
     except jwt.ExpiredSignatureError as exc:
         # remove old token row
-        db.delete(token_row)
-        db.commit()
+        expired = jwt.decode(payload.refresh_token, JWT_SECRET, algorithms=["HS256"],
+                             options={"verify_exp": False})
+        if expired.get("jti"):
+            db.query(models.Token).filter(
+                models.Token.jti_hash == hash_jti(expired["jti"])).delete()
+            db.commit()
         raise HTTPException(status_code=401, detail="Refresh token expired") from exc
     except jwt.PyJWTError as exc:
         raise HTTPException(status_code=401, detail="Invalid refresh token") from exc
 
+    if decoded.get("type") != "refresh" or not decoded.get("jti"):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # Validate refresh token existence in DB
+    token_row = db.query(models.Token).filter(
+        models.Token.jti_hash == hash_jti(decoded["jti"])).first()
+    if not token_row or str(token_row.user_id) != decoded.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
     user = db.query(models.User).filter(models.User.id == token_row.user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid user")
@@ -122,3 +144,22 @@ def refresh_token(payload: RefreshRequest, db: Session = Depends(get_db)):
         "expires_at": token_row.expires_at,
         "created_at": token_row.created_at,
     }
+
+
+def sweep_expired_tokens(db: Session, batch_size: int = TOKEN_SWEEP_BATCH) -> int:
+    """Supprime les refresh tokens expirés par lots ; retourne le nombre de lignes supprimées."""
+    deleted = 0
+    now = datetime.utcnow()
+    while True:
+        ids = [row.id for row in db.query(models.Token.id)
+               .filter(models.Token.expires_at < now)
+               .limit(batch_size)]
+        if not ids:
+            break
+        db.query(models.Token).filter(models.Token.id.in_(ids)).delete(
+            synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+    if deleted:
+        logging.info("Token sweeper: %s expired refresh tokens deleted", deleted)
+    return deleted
@@ -1,38 +1,45 @@
 # routes/users.py
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from passlib.context import CryptContext
 
+import cascades
 import models
 import schemas
-from dependencies import API_PATH_ROOT, get_current_user, get_db, admin_required
+from dependencies import (API_PATH_ROOT, get_current_user, get_db, get_async_db,
+                          admin_required)
+from invalidation import ALL, publish
+from pagination import PageParams, keyset, paginate
+from passwords import hash_password
 
 router = APIRouter(prefix=f"{API_PATH_ROOT}/users", tags=["Users"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
 @router.post("", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(payload: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(models.User).filter((models.User.email == payload.email) |
-                                            (models.User.username == payload.username)).first()
+async def create_user(payload: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(models.User).where(
+        or_(models.User.email == payload.email, models.User.username == payload.username)))
     if existing:
         raise HTTPException(status_code=400, detail="Email or username already registered")
 
-    hashed = pwd_context.hash(payload.password[:72])
+    # Rend la connexion au pool pendant bcrypt (le job peut attendre dans la file)
+    await db.rollback()
+    hashed = await hash_password(payload.password[:72])
     user = models.User(email=payload.email, username=payload.username, hashed_password=hashed)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.get("", response_model=List[schemas.UserOut])
-def list_users(db: Session = Depends(get_db),
+def list_users(request: Request, response: Response,
+               page: PageParams = Depends(),
+               db: Session = Depends(get_db),
                current_user: models.User = Depends(admin_required)):
-    users = db.query(models.User).all()
+    users = paginate(keyset(db.query(models.User), models.User, page), page, request, response)
     print(current_user)
     return users
 
@@ -51,28 +58,32 @@ def get_user(user_id: int, db: Session = Depends(get_db),
 
 
 @router.put("/{user_id}", response_model=schemas.UserOut)
-def update_user(user_id: int, payload: schemas.UserUpdate, db: Session = Depends(get_db),
-                current_user: models.User = Depends(get_current_user)):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+async def update_user(user_id: int, payload: schemas.UserUpdate,
+                      db: AsyncSession = Depends(get_async_db),
+                      current_user: models.User = Depends(get_current_user)):
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     if current_user.id != user.id and not current_user.is_admin:  # type: ignore
         raise HTTPException(status_code=403, detail="Forbidden")
 
+    if payload.password:
+        # Rend la connexion au pool pendant bcrypt ; `user` est rechargé au commit
+        await db.rollback()
+        user.hashed_password = await hash_password(payload.password) # type: ignore
     if payload.email:
         user.email = payload.email # type: ignore
     if payload.username:
         user.username = payload.username # type: ignore
-    if payload.password:
-        user.hashed_password = pwd_context.hash(payload.password) # type: ignore
 
     try:
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     except IntegrityError as exc:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Email déjà utilisé") from exc
 
+    publish(("user", user.id))
     return user
 
 
@@ -82,7 +93,8 @@ def delete_user(user_id: int, db: Session = Depends(get_db),
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
-    db.delete(user)
+    cascades.delete_user(db, user_id)
     db.commit()
+    publish(("user", user_id), ALL)  # ALL : vues admin des caves supprimées
     print(current_user)
     # return None
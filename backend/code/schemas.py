@@ -1,5 +1,5 @@
 # schemas.py
-from typing import Optional
+from typing import List, Optional, Union
 from datetime import datetime
 from pydantic import BaseModel, EmailStr, Field
 
@@ -9,6 +9,7 @@ class TokenOut(BaseModel):
     id: str
     user_id: int
     token: str
+    refresh_token: Optional[str] = None
     expires_at: datetime
     created_at: datetime
 
@@ -90,6 +91,9 @@ class WineCellarOut(BaseModel):
     name: str
     location: Optional[str]
     capacity: Optional[int]
+    bottle_count: int = 0
+    total_quantity: int = 0
+    total_value: float = 0.0
     created_at: datetime
     updated_at: datetime
 
@@ -106,7 +110,7 @@ class WineBottleCreate(BaseModel):
     region: Optional[str] = None
     country: Optional[str] = None
     price: Optional[float] = None
-    quantity: Optional[int] = 1
+    quantity: Optional[int] = Field(1, ge=1)
     image_url: Optional[str] = None
     notes: Optional[str] = None
     scrape: bool = False
@@ -119,7 +123,7 @@ class WineBottleUpdate(BaseModel):
     region: Optional[str] = None
     country: Optional[str] = None
     price: Optional[float] = 0.0
-    quantity: Optional[int] = 1
+    quantity: Optional[int] = Field(1, ge=0)  # 0 : bouteille bue, gardée dans l'historique
     image_url: Optional[str] = None
     notes: Optional[str] = None
 
@@ -144,3 +148,79 @@ class WineBottleOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# ---- Toutes les bouteilles de l'utilisateur (/me/bottles) ----
+class MyBottleOut(WineBottleOut):
+    cellar_name: str
+
+
+class CellarBottlesOut(BaseModel):
+    cellar_id: str
+    cellar_name: str
+    bottles: List[WineBottleOut]
+
+
+# ---- Bulk import ----
+class WineBottleImport(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    vintage: int
+    wine_type: str = Field(..., min_length=1, max_length=64)
+    region: Optional[str] = Field(None, max_length=255)
+    country: Optional[str] = Field(None, max_length=128)
+    price: Optional[float] = None
+    quantity: Optional[int] = Field(1, ge=1)
+    image_url: Optional[str] = Field(None, max_length=1024)
+    notes: Optional[str] = None
+
+
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class BulkImportOut(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+
+
+# ---- Opérations par lot (/bottles) ----
+class WineBottleBatchUpdate(WineBottleUpdate):
+    id: str
+
+
+class BatchDeleteIn(BaseModel):
+    ids: List[str]
+
+
+class BatchItemResult(BaseModel):
+    id: str
+    status: int
+    detail: Optional[str] = None
+    bottle: Optional[WineBottleOut] = None
+
+
+class BatchResultOut(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+
+# ---- Statistics ----
+class StatsBucket(BaseModel):
+    key: Union[int, str, None]
+    bottles: int
+    quantity: int
+    total_value: float
+
+
+class CellarStatsOut(BaseModel):
+    cellar_id: Optional[str] = None
+    bottles: int
+    quantity: int
+    total_value: float
+    by_wine_type: List[StatsBucket]
+    by_decade: List[StatsBucket]
+    by_country: List[StatsBucket]
+    by_region: List[StatsBucket]
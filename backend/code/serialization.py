@@ -0,0 +1,105 @@
+# serialization.py
+# Chemin rapide des listes : les colonnes du schéma de sortie sont lues en tuples Core
+# (ni objets ORM, ni validation Pydantic) puis encodées directement par orjson.
+# Les noms et l'ordre des champs viennent du schéma ; une colonne manquante est une
+# erreur au démarrage, pas une réponse incomplète.
+# Les listes ne lisent que les champs demandés (`?fields=`) ; les champs lourds
+# (`notes`) ne sont lus que sur demande ou par get_bottle.
+from decimal import Decimal
+from functools import lru_cache
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import select
+
+import models
+import schemas
+
+
+def _default(value):
+    if isinstance(value, Decimal):  # MySQL : SUM() / NUMERIC
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class RowSerializer:
+    """Lignes Core dont les premières colonnes suivent les champs de `schema`.
+
+    `fields` restreint la projection (sparse fieldset) ; `id` est toujours inclus.
+    """
+
+    def __init__(self, schema, *sources, fields=None, deferred=()):
+        self.schema = schema
+        self.sources = sources
+        self.deferred = tuple(deferred)
+        self.fields = tuple(name for name in schema.model_fields
+                            if fields is None or name in fields or name == "id")
+        self.columns = []
+        for name in self.fields:
+            source = next((s for s in sources if name in s), None)
+            if source is None:
+                raise RuntimeError(f"{schema.__name__}.{name} has no matching column")
+            self.columns.append(source[name])
+
+    def select(self, *extra):
+        """SELECT des champs, puis des colonnes `extra` absentes (clés de pagination...)."""
+        return select(*self.columns, *(c for c in extra if c.key not in self.fields))
+
+    def dicts(self, rows) -> list:
+        # les colonnes en plus (score, clé de tri...) sont ignorées par zip
+        return [dict(zip(self.fields, row)) for row in rows]
+
+    def dumps(self, rows) -> bytes:
+        return dumps(self.dicts(rows))
+
+    def project(self, fields: Optional[str]) -> "RowSerializer":
+        """Projection demandée par `?fields=` : liste séparée par des virgules, `*` pour
+        tous les champs ; par défaut, tous sauf les champs différés (`notes`...)."""
+        if fields is None:
+            wanted = frozenset(self.fields) - frozenset(self.deferred)
+        elif fields.strip() == "*":
+            wanted = frozenset(self.schema.model_fields)
+        else:
+            wanted = frozenset(f.strip() for f in fields.split(",") if f.strip())
+            unknown = sorted(wanted - frozenset(self.schema.model_fields))
+            if unknown:
+                raise HTTPException(status_code=400,
+                                    detail=f"Champs inconnus : {', '.join(unknown)}")
+        return self._projection(wanted)
+
+    @lru_cache(maxsize=128)
+    def _projection(self, wanted: frozenset) -> "RowSerializer":
+        return RowSerializer(self.schema, *self.sources, fields=wanted, deferred=self.deferred)
+
+
+def fields_param(serializer: RowSerializer):
+    """Dépendance `?fields=` des routes de liste, résolue en projection de `serializer`."""
+    def dependency(fields: Optional[str] = Query(
+            None, description="Champs à renvoyer, séparés par des virgules (`*` : tous). "
+                              f"Par défaut, tous sauf : {', '.join(serializer.deferred)}")):
+        return serializer.project(fields)
+    return dependency
+
+
+def json_response(body: bytes, response: Response = None) -> Response:
+    """Réponse JSON déjà encodée ; reprend les en-têtes posés sur `response` (curseur...)."""
+    headers = None
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items()
+                   if k not in ("content-length", "content-type")}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+LIST_DEFERRED = ("notes",)
+
+CELLAR_NAME = models.WineCellar.name.label("cellar_name")
+
+BOTTLES = RowSerializer(schemas.WineBottleOut, models.WineBottle.__table__.c,
+                        deferred=LIST_DEFERRED)
+MY_BOTTLES = RowSerializer(schemas.MyBottleOut, models.WineBottle.__table__.c,
+                           {"cellar_name": CELLAR_NAME}, deferred=LIST_DEFERRED)
@@ -11,8 +11,8 @@ BASE_URL = "http://localhost:5000/api"
 # ============================
 #
 
-def api(method, path, token=None, **kwargs):
-    headers = {}
+def api(method, path, token=None, headers=None, **kwargs):
+    headers = dict(headers or {})
     if token:
         headers["Authorization"] = f"Bearer {token}"
     return requests.request(method, f"{BASE_URL}{path}", headers=headers, **kwargs)
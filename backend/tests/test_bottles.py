@@ -1,3 +1,5 @@
+import json
+
 from conftest import api
 
 def test_add_and_update_bottle(create_bottle, user_token):
@@ -26,3 +28,319 @@ def test_delete_bottle(create_bottle, user_token):
 
     res = api("delete", f"/bottles/{bottle['id']}", token=user_token)
     assert res.status_code in (204, 404)
+
+
+def test_bulk_import_json(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    rows = [
+        {"name": "Bulk Red", "vintage": 2010, "wine_type": "Rouge", "price": 12.5},
+        {"name": "Bulk White", "vintage": 2018, "wine_type": "Blanc", "quantity": 6},
+        {"name": "Missing vintage", "wine_type": "Rouge"},
+    ]
+    res = api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+    assert res.status_code == 201
+    data = res.json()
+    assert data["inserted"] == 2
+    assert data["failed"] == 1
+    assert data["errors"][0]["row"] == 3
+
+    res2 = api("get", f"/cellars/{cellar['id']}/bottles", token=user_token)
+    assert len(res2.json()) == 2
+
+
+def test_negative_quantity_rejected(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    rows = [{"name": "Negative", "vintage": 2010, "wine_type": "Rouge", "quantity": -50}]
+    res = api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+    assert res.status_code == 201
+    assert res.json()["inserted"] == 0
+    assert res.json()["failed"] == 1
+
+    res = api("post", f"/cellars/{cellar['id']}/bottles", token=user_token,
+              json={"name": "Zero", "vintage": 2010, "wine_type": "Rouge", "quantity": 0})
+    assert res.status_code == 422
+
+    res = api("get", f"/cellars/{cellar['id']}", token=user_token)
+    assert res.json()["total_quantity"] == 0
+
+
+def test_update_quantity_to_zero(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    res = api("post", f"/cellars/{cellar['id']}/bottles", token=user_token,
+              json={"name": "Drunk", "vintage": 2010, "wine_type": "Rouge", "quantity": 3})
+    assert res.status_code == 201
+    bottle = res.json()
+
+    # une mise à jour peut ramener la quantité à 0 (refusé à la création seulement)
+    res = api("put", f"/bottles/{bottle['id']}", json={"quantity": 0}, token=user_token)
+    assert res.status_code == 200
+    assert res.json()["quantity"] == 0
+    counters = api("get", f"/cellars/{cellar['id']}", token=user_token).json()
+    assert (counters["bottle_count"], counters["total_quantity"]) == (1, 0)
+
+    res = api("put", f"/bottles/{bottle['id']}", json={"quantity": -1}, token=user_token)
+    assert res.status_code == 422
+
+
+def test_bulk_import_csv(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    body = (
+        "name;vintage;wine_type;region;country;price;quantity;notes\n"
+        "Petrus 1987;1987;Rouge;Bordeaux;France;2449.87;5;\"Notes\nsur deux lignes\"\n"
+        "Cloudy Bay;2003;Blanc;Marlborough;Nouvelle-Zélande;;2;\n"
+    )
+    res = api("post", f"/cellars/{cellar['id']}/bottles:bulk", data=body.encode(),
+              token=user_token, headers={"Content-Type": "text/csv"})
+    assert res.status_code == 201
+    assert res.json()["inserted"] == 2
+
+
+def test_bulk_import_strict(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    rows = [{"name": "Ok", "vintage": 2000, "wine_type": "Rouge"}, {"name": "Bad"}]
+    res = api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows,
+              token=user_token, params={"strict": "true"})
+    assert res.status_code == 422
+
+    res2 = api("get", f"/cellars/{cellar['id']}/bottles", token=user_token)
+    assert res2.json() == []
+
+
+def test_export_bottles(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    rows = [{"name": f"Export {i}", "vintage": 2000 + i, "wine_type": "Rouge"} for i in range(3)]
+    api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+
+    res = api("get", f"/cellars/{cellar['id']}/bottles/export", token=user_token)
+    assert res.status_code == 200
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert sorted(b["name"] for b in lines) == ["Export 0", "Export 1", "Export 2"]
+
+    res_csv = api("get", f"/cellars/{cellar['id']}/bottles/export",
+                  token=user_token, params={"format": "csv"})
+    assert res_csv.status_code == 200
+    assert res_csv.text.splitlines()[0].startswith("id,cellar_id,name")
+    assert len(res_csv.text.splitlines()) == 4
+
+
+def test_search_bottles(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    rows = [
+        {"name": "Search Margaux", "vintage": 2005, "wine_type": "Rouge",
+         "country": "France", "price": 300},
+        {"name": "Search Chablis", "vintage": 2015, "wine_type": "Blanc",
+         "country": "France", "price": 40},
+        {"name": "Search Rioja", "vintage": 2012, "wine_type": "Rouge",
+         "country": "Espagne"},
+    ]
+    api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+    base = {"cellar_id": cellar["id"]}
+
+    res = api("get", "/bottles/search", token=user_token,
+              params={**base, "wine_type": "Rouge", "vintage_min": 2010})
+    assert res.status_code == 200
+    assert [b["name"] for b in res.json()] == ["Search Rioja"]
+
+    res = api("get", "/bottles/search", token=user_token,
+              params={**base, "name": "Search C"})
+    assert [b["name"] for b in res.json()] == ["Search Chablis"]
+
+    res = api("get", "/bottles/search", token=user_token,
+              params={**base, "sort": "price", "order": "desc", "limit": 2})
+    assert [b["name"] for b in res.json()] == ["Search Margaux", "Search Chablis"]
+    cursor = res.headers.get("X-Next-Cursor")
+    assert cursor
+
+    res = api("get", "/bottles/search", token=user_token,
+              params={**base, "sort": "price", "order": "desc", "limit": 2, "cursor": cursor})
+    assert [b["name"] for b in res.json()] == ["Search Rioja"]
+
+
+def test_fulltext_search(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    rows = [
+        {"name": "Fulltext Margaux", "vintage": 2005, "wine_type": "Rouge",
+         "region": "Bordeaux", "notes": "cassis, cèdre et tabac"},
+        {"name": "Fulltext Chablis", "vintage": 2015, "wine_type": "Blanc",
+         "region": "Bourgogne", "notes": "minéral, agrumes"},
+        {"name": "Fulltext Pauillac", "vintage": 2010, "wine_type": "Rouge",
+         "region": "Bordeaux", "notes": "cassis intense, cassis mûr"},
+    ]
+    api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+    base = {"cellar_id": cellar["id"]}
+
+    res = api("get", "/bottles/search", token=user_token, params={**base, "q": "cassis"})
+    assert res.status_code == 200
+    names = [b["name"] for b in res.json()]
+    assert sorted(names) == ["Fulltext Margaux", "Fulltext Pauillac"]
+
+    res = api("get", "/bottles/search", token=user_token, params={**base, "q": "chab"})
+    assert [b["name"] for b in res.json()] == ["Fulltext Chablis"]
+
+    # la clé du curseur (score, millésime) est lue même hors de `fields`
+    for extra in ({}, {"sort": "vintage"}):
+        params = {**base, **extra, "q": "bordeaux", "limit": 1, "fields": "name"}
+        res = api("get", "/bottles/search", token=user_token, params=params)
+        assert len(res.json()) == 1
+        cursor = res.headers.get("X-Next-Cursor")
+        assert cursor
+        res2 = api("get", "/bottles/search", token=user_token, params={**params, "cursor": cursor})
+        assert len(res2.json()) == 1
+        assert res2.json()[0]["id"] != res.json()[0]["id"]
+    assert [b["name"] for b in res.json() + res2.json()] == ["Fulltext Margaux",
+                                                             "Fulltext Pauillac"]
+
+    res = api("get", "/bottles/search", token=user_token, params={**base, "sort": "relevance"})
+    assert res.status_code == 400
+
+
+def test_bottle_ownership(create_bottle, create_user, admin_token):
+    r = create_bottle()
+    user = create_user()
+    if not r or not user:
+        return
+    cellar_id, bottle = r
+    token = api("post", "/tokens", json={"email": user["email"], "password": "pass"}).json()["token"]
+
+    # un autre utilisateur ne voit ni la cave ni la bouteille
+    assert api("get", f"/cellars/{cellar_id}", token=token).status_code == 404
+    assert api("get", f"/bottles/{bottle['id']}", token=token).status_code == 404
+    assert api("delete", f"/bottles/{bottle['id']}", token=token).status_code == 404
+    # l'admin voit tout
+    assert api("get", f"/bottles/{bottle['id']}", token=admin_token).status_code == 200
+
+
+def test_my_bottles(create_cellar, user_token):
+    first, second = create_cellar(), create_cellar()
+    if not first or not second:
+        return
+    for cellar in (first, second):
+        rows = [{"name": f"Mine {cellar['name']} {i}", "vintage": 2010, "wine_type": "Rouge"}
+                for i in range(3)]
+        api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+    ids = [first["id"], second["id"]]
+
+    res = api("get", "/me/bottles", token=user_token, params={"cellar_id": ids})
+    assert res.status_code == 200
+    bottles = res.json()
+    assert len(bottles) == 6
+    assert {b["cellar_name"] for b in bottles} == {first["name"], second["name"]}
+
+    res = api("get", "/me/bottles", token=user_token,
+              params={"cellar_id": ids, "group_by_cellar": "true", "limit": 4})
+    assert res.status_code == 200
+    groups = res.json()
+    assert [len(g["bottles"]) for g in groups] == [3, 1]
+    cursor = res.headers.get("X-Next-Cursor")
+    assert cursor
+    res = api("get", "/me/bottles", token=user_token,
+              params={"cellar_id": ids, "group_by_cellar": "true", "limit": 4, "cursor": cursor})
+    assert sum(len(g["bottles"]) for g in res.json()) == 2
+
+
+def test_batch_bottles(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+    rows = [{"name": f"Batch {i}", "vintage": 2000 + i, "wine_type": "Rouge", "price": 10}
+            for i in range(3)]
+    api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+    ids = [b["id"] for b in api("get", f"/cellars/{cellar['id']}/bottles", token=user_token).json()]
+
+    res = api("get", "/bottles", token=user_token, params={"ids": ",".join(ids + ["missing"])})
+    assert res.status_code == 200
+    assert [b["id"] for b in res.json()] == ids
+
+    updates = [{"id": ids[0], "quantity": 4}, {"id": ids[1], "notes": "batch"},
+               {"id": "missing", "quantity": 2}]
+    res = api("patch", "/bottles", json=updates, token=user_token)
+    assert res.status_code == 200
+    data = res.json()
+    assert (data["succeeded"], data["failed"]) == (2, 1)
+    assert [r["status"] for r in data["results"]] == [200, 200, 404]
+    assert data["results"][0]["bottle"]["quantity"] == 4
+    assert data["results"][1]["bottle"]["notes"] == "batch"
+
+    # capacité dépassée : l'élément échoue et n'est pas appliqué
+    res = api("patch", "/bottles", json=[{"id": ids[2], "quantity": 500}], token=user_token)
+    assert res.json()["results"][0]["status"] == 400
+    assert api("get", f"/bottles/{ids[2]}", token=user_token).json()["quantity"] == 1
+
+    res = api("post", "/bottles:batchDelete", json={"ids": ids[:2] + ["missing"]},
+              token=user_token)
+    assert res.status_code == 200
+    assert [r["status"] for r in res.json()["results"]] == [204, 204, 404]
+
+    counters = api("get", f"/cellars/{cellar['id']}", token=user_token).json()
+    assert counters["bottle_count"] == 1
+    assert counters["total_quantity"] == 1
+
+
+def test_list_rows_match_schema(create_bottle, user_token):
+    # les listes (lignes Core + orjson) doivent rendre exactement le WineBottleOut de get_bottle
+    created = create_bottle()
+    if not created:
+        return
+    cellar_id, bottle = created
+    api("put", f"/bottles/{bottle['id']}", json={"price": 12.5, "notes": "Épicé"},
+        token=user_token)
+    single = api("get", f"/bottles/{bottle['id']}", token=user_token).json()
+    listed = {k: v for k, v in single.items() if k != "notes"}  # différé par défaut
+
+    assert api("get", f"/cellars/{cellar_id}/bottles", token=user_token).json() == [listed]
+    assert api("get", f"/cellars/{cellar_id}/bottles", token=user_token,
+               params={"fields": "*"}).json() == [single]
+    found = api("get", "/bottles/search", token=user_token, params={"cellar_id": cellar_id})
+    assert found.json() == [listed]
+    mine = api("get", "/me/bottles", token=user_token,
+               params={"cellar_id": cellar_id, "fields": "*"}).json()
+    assert mine[0].pop("cellar_name")
+    assert mine == [single]
+    many = api("get", "/bottles", token=user_token, params={"ids": bottle["id"]}).json()
+    assert many == [listed]
+
+
+def test_sparse_fieldsets(create_bottle, user_token):
+    created = create_bottle()
+    if not created:
+        return
+    cellar_id, bottle = created
+    params = {"fields": "name,notes"}
+    for path, extra in ((f"/cellars/{cellar_id}/bottles", {}),
+                        ("/bottles/search", {"cellar_id": cellar_id}),
+                        ("/bottles", {"ids": bottle["id"]})):
+        rows = api("get", path, token=user_token, params={**params, **extra}).json()
+        assert rows == [{"id": bottle["id"], "name": bottle["name"], "notes": None}]
+
+    grouped = api("get", "/me/bottles", token=user_token, params={
+        "cellar_id": cellar_id, "group_by_cellar": "true", "fields": "vintage"}).json()
+    assert grouped[0]["cellar_id"] == cellar_id
+    assert grouped[0]["bottles"] == [{"id": bottle["id"], "vintage": 2000}]
+
+    res = api("get", f"/cellars/{cellar_id}/bottles", token=user_token,
+              params={"fields": "name,password"})
+    assert res.status_code == 400
@@ -12,3 +12,145 @@ def test_create_and_get_cellar(create_cellar, user_token):
 def test_list_cellars(user_token):
     res = api("get", "/cellars", token=user_token)
     assert res.status_code in (200, 403)
+
+
+def test_list_cellars_pagination(create_cellar, user_token):
+    for _ in range(3):
+        create_cellar()
+
+    res = api("get", "/cellars", token=user_token, params={"limit": 2})
+    assert res.status_code == 200
+    first_page = res.json()
+    assert len(first_page) == 2
+    cursor = res.headers.get("X-Next-Cursor")
+    assert cursor
+    assert 'rel="next"' in res.headers.get("Link", "")
+
+    res2 = api("get", "/cellars", token=user_token, params={"limit": 2, "cursor": cursor})
+    assert res2.status_code == 200
+    first_ids = {c["id"] for c in first_page}
+    assert all(c["id"] not in first_ids for c in res2.json())
+
+
+def test_list_cellars_invalid_cursor(user_token):
+    res = api("get", "/cellars", token=user_token, params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
+
+
+def test_cellar_stats(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+
+    rows = [
+        {"name": "A", "vintage": 2001, "wine_type": "Rouge", "country": "France",
+         "price": 10, "quantity": 2},
+        {"name": "B", "vintage": 2009, "wine_type": "Rouge", "country": "France",
+         "price": 5, "quantity": 1},
+        {"name": "C", "vintage": 2015, "wine_type": "Blanc", "country": "Italie",
+         "quantity": 3},
+    ]
+    api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+
+    res = api("get", f"/cellars/{cellar['id']}/stats", token=user_token)
+    assert res.status_code == 200
+    stats = res.json()
+    assert stats["bottles"] == 3
+    assert stats["quantity"] == 6
+    assert stats["total_value"] == 25
+    by_type = {b["key"]: b for b in stats["by_wine_type"]}
+    assert by_type["Rouge"]["quantity"] == 3
+    by_decade = {b["key"]: b["bottles"] for b in stats["by_decade"]}
+    assert by_decade == {2000: 2, 2010: 1}
+
+    res = api("get", "/cellars/stats", token=user_token)
+    assert res.status_code == 200
+    assert res.json()["bottles"] >= 3
+
+
+def test_cellar_counters(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+    path = f"/cellars/{cellar['id']}"
+
+    bottle = {"name": "Counted", "vintage": 2000, "wine_type": "Rouge", "price": 10, "quantity": 2}
+    res = api("post", f"{path}/bottles", json=bottle, token=user_token)
+    assert res.status_code == 201
+    bottle_id = res.json()["id"]
+    api("post", f"{path}/bottles:bulk", json=[{**bottle, "quantity": 3}], token=user_token)
+
+    data = api("get", path, token=user_token).json()
+    assert (data["bottle_count"], data["total_quantity"], data["total_value"]) == (2, 5, 50)
+
+    api("put", f"/bottles/{bottle_id}", json={"quantity": 4}, token=user_token)
+    data = api("get", path, token=user_token).json()
+    assert (data["bottle_count"], data["total_quantity"], data["total_value"]) == (2, 7, 70)
+
+    api("delete", f"/bottles/{bottle_id}", token=user_token)
+    data = api("get", path, token=user_token).json()
+    assert (data["bottle_count"], data["total_quantity"], data["total_value"]) == (1, 3, 30)
+
+
+def test_cellar_capacity_enforced(user_token):
+    res = api("post", "/cellars", json={"name": "Small", "location": None, "capacity": 2},
+              token=user_token)
+    cellar_id = res.json()["id"]
+    bottle = {"name": "Big", "vintage": 2000, "wine_type": "Rouge", "quantity": 3}
+    res = api("post", f"/cellars/{cellar_id}/bottles", json=bottle, token=user_token)
+    assert res.status_code == 400
+    res = api("post", f"/cellars/{cellar_id}/bottles:bulk", json=[bottle], token=user_token)
+    assert res.status_code == 400
+    assert api("get", f"/cellars/{cellar_id}/bottles", token=user_token).json() == []
+
+
+def test_repair_counters(admin_token, user_token):
+    res = api("post", "/admin/repair-counters", token=user_token)
+    assert res.status_code == 403
+    res = api("post", "/admin/repair-counters", token=admin_token)
+    assert res.status_code == 200
+    assert res.json()["cellars"] >= 1
+
+
+def test_cellar_etag(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+    path = f"/cellars/{cellar['id']}"
+
+    for url in (path, f"{path}/bottles", "/cellars"):
+        res = api("get", url, token=user_token)
+        etag = res.headers["ETag"]
+        assert "no-cache" in res.headers["Cache-Control"]
+        res2 = api("get", url, token=user_token, headers={"If-None-Match": etag})
+        assert res2.status_code == 304
+        assert res2.content == b""
+
+    bottles_etag = api("get", f"{path}/bottles", token=user_token).headers["ETag"]
+    bottle = {"name": "Etag", "vintage": 2000, "wine_type": "Rouge"}
+    created = api("post", f"{path}/bottles", json=bottle, token=user_token).json()
+    res = api("get", f"{path}/bottles", token=user_token, headers={"If-None-Match": bottles_etag})
+    assert res.status_code == 200
+    assert len(res.json()) == 1
+
+    bottle_etag = api("get", f"/bottles/{created['id']}", token=user_token).headers["ETag"]
+    api("put", f"/bottles/{created['id']}", json={"name": "Etag 2"}, token=user_token)
+    res = api("get", f"/bottles/{created['id']}", token=user_token,
+              headers={"If-None-Match": bottle_etag})
+    assert res.status_code == 200
+    assert res.json()["name"] == "Etag 2"
+
+
+def test_delete_cellar_with_bottles(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+    rows = [{"name": f"B{i}", "vintage": 2000 + i % 20, "wine_type": "Rouge"} for i in range(50)]
+    api("post", f"/cellars/{cellar['id']}/bottles:bulk", json=rows, token=user_token)
+    bottle_id = api("get", f"/cellars/{cellar['id']}/bottles", token=user_token,
+                    params={"limit": 1}).json()[0]["id"]
+
+    res = api("delete", f"/cellars/{cellar['id']}", token=user_token)
+    assert res.status_code == 204
+    assert api("get", f"/cellars/{cellar['id']}", token=user_token).status_code == 404
+    assert api("get", f"/bottles/{bottle_id}", token=user_token).status_code == 404
@@ -0,0 +1,40 @@
+from conftest import api
+
+def test_health_db():
+    res = api("get", "/health/db")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["status"] == "ok"
+    assert "checkedout" in data
+    assert "overflow" in data
+    assert "wait_avg_ms" in data
+
+
+def test_health_cache(user_token):
+    api("get", "/cellars", token=user_token)
+    api("get", "/cellars", token=user_token)
+    res = api("get", "/health/cache")
+    assert res.status_code == 200
+    users = res.json()["users"]
+    assert users["hits"] >= 1
+    assert users["size"] >= 1
+
+
+def test_user_cache_invalidated_on_delete(admin_token, create_user):
+    user = create_user()
+    if not user:
+        return
+    token = api("post", "/tokens", json={"email": user["email"], "password": "pass"}).json()["token"]
+    api("get", "/cellars", token=token)
+
+    api("delete", f"/users/{user['id']}", token=admin_token)
+    res = api("get", "/cellars", token=token)
+    assert res.status_code == 401
+
+
+def test_health_passwords():
+    res = api("get", "/health/passwords")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["verify"]["count"] >= 1
+    assert data["in_flight"] >= 0
@@ -0,0 +1,30 @@
+from conftest import api
+
+def test_server_timing_header(user_token):
+    res = api("get", "/cellars", token=user_token)
+    assert res.status_code == 200
+    timing = res.headers.get("Server-Timing", "")
+    assert "db;dur=" in timing
+    assert "app;dur=" in timing
+
+
+def test_metrics_endpoint(user_token):
+    api("get", "/cellars", token=user_token)
+    res = api("get", "/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert "http_requests_in_flight" in body
+    assert 'route="/api/cellars"' in body or 'route="/cellars"' in body
+    assert "http_request_duration_seconds_bucket" in body
+    assert "db_queries_total" in body
+
+
+def test_debug_queries(admin_token, user_token):
+    assert api("get", "/debug/queries", token=user_token).status_code == 403
+    res = api("get", "/debug/queries", token=admin_token, params={"kind": "slow"})
+    assert res.status_code == 200
+    data = res.json()
+    assert "slow_query_ms" in data
+    assert "n_plus_one_threshold" in data
+    assert all(e["kind"] == "slow" for e in data["events"])
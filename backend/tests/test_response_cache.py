@@ -0,0 +1,117 @@
+import re
+
+from conftest import api
+
+
+def _queries(res):
+    return int(re.search(r'desc="(\d+) queries"', res.headers["Server-Timing"]).group(1))
+
+
+def test_cached_reads_skip_database(create_bottle, user_token):
+    created = create_bottle()
+    if not created:
+        return
+    cellar_id, bottle = created
+    for path in (f"/cellars/{cellar_id}", f"/cellars/{cellar_id}/bottles",
+                 f"/bottles/{bottle['id']}", "/cellars"):
+        first = api("get", path, token=user_token)
+        second = api("get", path, token=user_token)
+        assert second.status_code == 200
+        assert second.json() == first.json()
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert _queries(second) == 0
+
+        res = api("get", path, token=user_token, headers={"If-None-Match": first.headers["ETag"]})
+        assert res.status_code == 304
+
+
+def test_cache_hits_take_no_pool_connection(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+    path = f"/cellars/{cellar['id']}"
+    api("get", path, token=user_token)
+
+    before = api("get", "/health/db").json()["checkouts"]
+    for _ in range(10):
+        assert api("get", path, token=user_token).status_code == 200
+    # seul le SELECT 1 du second /health/db prend une connexion
+    assert api("get", "/health/db").json()["checkouts"] - before <= 1
+
+
+def test_writes_invalidate_cached_reads(create_bottle, user_token):
+    created = create_bottle()
+    if not created:
+        return
+    cellar_id, bottle = created
+    api("get", f"/cellars/{cellar_id}", token=user_token)
+    api("get", f"/cellars/{cellar_id}/bottles", token=user_token)
+    api("get", f"/bottles/{bottle['id']}", token=user_token)
+
+    api("put", f"/bottles/{bottle['id']}", json={"quantity": 3}, token=user_token)
+    assert api("get", f"/bottles/{bottle['id']}", token=user_token).json()["quantity"] == 3
+    assert api("get", f"/cellars/{cellar_id}/bottles",
+               token=user_token).json()[0]["quantity"] == 3
+    assert api("get", f"/cellars/{cellar_id}", token=user_token).json()["total_quantity"] == 3
+
+    res = api("put", f"/cellars/{cellar_id}", token=user_token,
+              json={"name": "Renamed", "location": None, "capacity": None})
+    assert res.status_code == 200
+    assert api("get", f"/cellars/{cellar_id}", token=user_token).json()["name"] == "Renamed"
+    cellars = api("get", "/cellars", token=user_token, params={"limit": 100}).json()
+    assert any(c["name"] == "Renamed" for c in cellars)
+
+    api("delete", f"/cellars/{cellar_id}", token=user_token)
+    assert api("get", f"/cellars/{cellar_id}", token=user_token).status_code == 404
+    assert api("get", f"/bottles/{bottle['id']}", token=user_token).status_code == 404
+
+
+def test_cache_is_per_user(create_cellar, user_token, admin_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+    api("get", f"/cellars/{cellar['id']}", token=user_token)
+    other = api("post", "/users", token=admin_token,
+                json={"email": "rc_other@example.com", "username": "rc_other", "password": "pass"})
+    if other.status_code != 201:
+        return
+    token = api("post", "/tokens",
+                json={"email": "rc_other@example.com", "password": "pass"}).json()["token"]
+    assert api("get", f"/cellars/{cellar['id']}", token=token).status_code == 404
+
+    stats = api("get", "/health/cache").json()["responses"]
+    assert stats["hits"] >= 0
+
+
+def test_invalidation_stats():
+    stats = api("get", "/health/cache").json()["invalidation"]
+    assert {"transport", "published", "received"} <= set(stats)
+
+
+def test_cache_stats_count_each_lookup_once(create_cellar, user_token):
+    cellar = create_cellar()
+    if not cellar:
+        return
+    before = api("get", "/health/cache").json()["responses"]
+    api("get", f"/cellars/{cellar['id']}", token=user_token)
+    api("get", f"/cellars/{cellar['id']}", token=user_token)
+    after = api("get", "/health/cache").json()["responses"]
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_successive_writes_invalidate(create_bottle, user_token):
+    created = create_bottle()
+    if not created:
+        return
+    cellar_id, bottle = created
+    path = f"/bottles/{bottle['id']}"
+    for quantity in (2, 3):
+        api("get", path, token=user_token)
+        api("put", path, json={"quantity": quantity}, token=user_token)
+        assert api("get", path, token=user_token).json()["quantity"] == quantity
+    for notes in ("first", "second"):
+        api("patch", "/bottles", json=[{"id": bottle["id"], "notes": notes}], token=user_token)
+        res = api("get", f"/cellars/{cellar_id}/bottles", token=user_token,
+                  params={"fields": "notes"})
+        assert res.json()[0]["notes"] == notes
@@ -1,5 +1,20 @@
+from conftest import api
+
 def test_token_validity(admin_token, user_token):
     assert isinstance(admin_token, str)
     assert isinstance(user_token, str)
     assert len(admin_token) > 10
     assert len(user_token) > 10
+
+
+def test_refresh_token():
+    res = api("post", "/tokens", json={"email": "admin@example.com", "password": "admin"})
+    assert res.status_code == 201
+    refresh = res.json()["refresh_token"]
+
+    res2 = api("post", "/tokens/refresh", json={"refresh_token": refresh})
+    assert res2.status_code == 200
+    assert res2.json()["token"]
+
+    res3 = api("post", "/tokens/refresh", json={"refresh_token": refresh + "x"})
+    assert res3.status_code == 401
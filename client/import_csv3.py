@@ -149,7 +149,7 @@ def main():
 
     # Step 4: Create two cellars
     cellar1_id = create_cellar(user_token, "Cellar One", "Rennes")
-    cellar2_id = create_cellar(user_token, "Cellar Two", "Saint-Malo")
+    cellar2_id = create_cellar(user_token, "Cellar Two", "Saint-Malo", capacity=200)
 
     # Step 5: Import bottles
     import_bottles(user_token, cellar1_id, cellar2_id, CSV_PATH)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import sys
+import requests
+
+from import_csv3 import (
+    BASE_URL, CSV_PATH, ADMIN_EMAIL, ADMIN_PASSWORD, USER_EMAIL, USER_PASSWORD,
+    clean, init, get_token, create_user, create_cellar,
+)
+
+
+def import_bottles_bulk(token: str, cellar_id: str, csv_path) -> None:
+    """Stream the whole CSV to the bulk endpoint: one request, one transaction."""
+    print(f"🍷 Bulk importing bottles from {csv_path}...")
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+    with open(csv_path, "rb") as csvfile:
+        res = requests.post(
+            f"{BASE_URL}/cellars/{cellar_id}/bottles:bulk",
+            data=csvfile,
+            headers=headers,
+            timeout=600,
+        )
+    if res.status_code != 201:
+        print(f"❌ Bulk import failed: {res.status_code} {res.text}")
+        sys.exit(1)
+    result = res.json()
+    print(f"✅ {result['inserted']} bottles imported, {result['failed']} rejected")
+    for error in result["errors"]:
+        print(f"   ⚠️  row {error['row']}: {'; '.join(error['errors'])}")
+
+
+def main():
+    print("🚀 Starting WineNot CSV bulk importer")
+
+    clean()
+    init()
+
+    admin_token = get_token(ADMIN_EMAIL, ADMIN_PASSWORD)
+    create_user(admin_token, USER_EMAIL, USER_PASSWORD)
+    user_token = get_token(USER_EMAIL, USER_PASSWORD)
+
+    cellar_id = create_cellar(user_token, "Cellar One", "Rennes", capacity=1000)
+    import_bottles_bulk(user_token, cellar_id, CSV_PATH)
+
+    print("🎉 Import completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,11 @@ $grouped_bottles = [];
 $cellar_names = []; // Tableau pour mapper les IDs des caves à leurs noms
 
 // Fonction pour exécuter une requête API avec rafraîchissement automatique
-function executeApiRequest($url, $options) {
+// ($response_headers reçoit les en-têtes HTTP de la réponse)
+function executeApiRequest($url, $options, &$response_headers = null) {
     $context = stream_context_create($options);
     $response = @file_get_contents($url, false, $context);
+    $response_headers = $http_response_header ?? [];
 
     if ($response === FALSE) {
         return false;
@@ -37,6 +39,7 @@ function executeApiRequest($url, $options) {
             ];
             $context = stream_context_create($options);
             $response = @file_get_contents($url, false, $context);
+            $response_headers = $http_response_header ?? [];
         } else {
             setcookie('user_token', '', time() - 3600, '/');
             header('Location: /auth/login.php?error=session_expired');
@@ -47,9 +50,19 @@ function executeApiRequest($url, $options) {
     return $response;
 }
 
-// 1. Récupère la liste des caves de l'utilisateur
-$cellars_api_url = $API_URL . "/cellars";
-$cellars_options = [
+// Curseur de la page suivante (en-tête X-Next-Cursor), ou null
+function nextCursor($headers) {
+    foreach ($headers as $header) {
+        if (stripos($header, 'X-Next-Cursor:') === 0) {
+            return trim(substr($header, strlen('X-Next-Cursor:')));
+        }
+    }
+    return null;
+}
+
+// Toutes les bouteilles de l'utilisateur en un seul appel (/me/bottles),
+// pages de 1000 tant que l'API renvoie un curseur
+$bottles_options = [
     'http' => [
         'header' => [
             "Authorization: Bearer {$user_token}",
@@ -59,87 +72,69 @@ $cellars_options = [
         'ignore_errors' => true,
     ],
 ];
+$cursor = null;
 
-$cellars_response = executeApiRequest($cellars_api_url, $cellars_options);
-
-if ($cellars_response === FALSE) {
-    $error = "Erreur de connexion à l'API pour récupérer les caves.";
-} else {
-    $cellars_result = json_decode($cellars_response, true);
-    if (json_last_error() !== JSON_ERROR_NONE || !is_array($cellars_result)) {
-        $error = "Réponse API invalide pour les caves.";
-    } else {
-        $cellars = $cellars_result;
-        // Crée un tableau associatif pour mapper les IDs des caves à leurs noms
-        foreach ($cellars as $cellar) {
-            if (isset($cellar['id']) && isset($cellar['name'])) {
-                $cellar_names[$cellar['id']] = $cellar['name'];
-            }
-        }
+do {
+    // Colonnes du tableau seulement (les notes ne sont pas affichées)
+    $query = ['limit' => 1000,
+              'fields' => 'cellar_id,cellar_name,name,vintage,wine_type,region,country,price,quantity'];
+    if ($cursor) {
+        $query['cursor'] = $cursor;
     }
-}
-
-// 2. Pour chaque cave, récupère les bouteilles
-if (!empty($cellars) && is_array($cellars)) {
-    foreach ($cellars as $cellar) {
-        $cellar_id = $cellar['id'] ?? '';
-        if (empty($cellar_id)) continue;
+    $bottles_api_url = $API_URL . "/me/bottles?" . http_build_query($query);
+    $bottles_response = executeApiRequest($bottles_api_url, $bottles_options, $response_headers);
 
-        $bottles_api_url = $API_URL . "/cellars/{$cellar_id}/bottles";
-        $bottles_options = [
-            'http' => [
-                'header' => [
-                    "Authorization: Bearer {$user_token}",
-                    "Content-type: application/json\r\n",
-                ],
-                'method' => 'GET',
-                'ignore_errors' => true,
-            ],
-        ];
+    if ($bottles_response === FALSE) {
+        $error = "Erreur de connexion à l'API pour récupérer les bouteilles.";
+        break;
+    }
+    $bottles_result = json_decode($bottles_response, true);
+    if (json_last_error() !== JSON_ERROR_NONE || !is_array($bottles_result)) {
+        $error = "Réponse API invalide pour les bouteilles.";
+        break;
+    }
 
-        $bottles_response = executeApiRequest($bottles_api_url, $bottles_options);
+    foreach ($bottles_result as $bottle) {
+        if (!is_array($bottle)) continue;
 
-        if ($bottles_response !== FALSE) {
-            $bottles_result = json_decode($bottles_response, true);
-            if (json_last_error() === JSON_ERROR_NONE && is_array($bottles_result)) {
-                foreach ($bottles_result as $bottle) {
-                    if (!is_array($bottle)) continue;
+        $cellar_id = $bottle['cellar_id'] ?? '';
+        if (isset($bottle['cellar_name'])) {
+            $cellar_names[$cellar_id] = $bottle['cellar_name'];
+        }
 
-                    // Crée une clé unique pour chaque bouteille
-                    $key = md5(
-                        ($bottle['name'] ?? '') .
-                        ($bottle['vintage'] ?? '') .
-                        ($bottle['wine_type'] ?? '') .
-                        ($bottle['region'] ?? '') .
-                        ($bottle['country'] ?? '')
-                    );
+        // Crée une clé unique pour chaque bouteille
+        $key = md5(
+            ($bottle['name'] ?? '') .
+            ($bottle['vintage'] ?? '') .
+            ($bottle['wine_type'] ?? '') .
+            ($bottle['region'] ?? '') .
+            ($bottle['country'] ?? '')
+        );
 
-                    if (!isset($grouped_bottles[$key])) {
-                        // Première occurrence de cette bouteille
-                        $grouped_bottles[$key] = [
-                            'id' => $bottle['id'] ?? '',
-                            'name' => $bottle['name'] ?? '',
-                            'vintage' => $bottle['vintage'] ?? '',
-                            'wine_type' => $bottle['wine_type'] ?? '',
-                            'region' => $bottle['region'] ?? '',
-                            'country' => $bottle['country'] ?? '',
-                            'price' => floatval($bottle['price'] ?? 0),
-                            'quantity' => intval($bottle['quantity'] ?? 0),
-                            'notes' => $bottle['notes'] ?? '',
-                            'cellar_ids' => [$cellar_id],
-                        ];
-                    } else {
-                        // Bouteille déjà présente, ajoute la quantité et l'ID de la cave
-                        $grouped_bottles[$key]['quantity'] += intval($bottle['quantity'] ?? 0);
-                        if (!in_array($cellar_id, $grouped_bottles[$key]['cellar_ids'])) {
-                            $grouped_bottles[$key]['cellar_ids'][] = $cellar_id;
-                        }
-                    }
-                }
+        if (!isset($grouped_bottles[$key])) {
+            // Première occurrence de cette bouteille
+            $grouped_bottles[$key] = [
+                'id' => $bottle['id'] ?? '',
+                'name' => $bottle['name'] ?? '',
+                'vintage' => $bottle['vintage'] ?? '',
+                'wine_type' => $bottle['wine_type'] ?? '',
+                'region' => $bottle['region'] ?? '',
+                'country' => $bottle['country'] ?? '',
+                'price' => floatval($bottle['price'] ?? 0),
+                'quantity' => intval($bottle['quantity'] ?? 0),
+                'cellar_ids' => [$cellar_id],
+            ];
+        } else {
+            // Bouteille déjà présente, ajoute la quantité et l'ID de la cave
+            $grouped_bottles[$key]['quantity'] += intval($bottle['quantity'] ?? 0);
+            if (!in_array($cellar_id, $grouped_bottles[$key]['cellar_ids'])) {
+                $grouped_bottles[$key]['cellar_ids'][] = $cellar_id;
             }
         }
     }
-}
+
+    $cursor = nextCursor($response_headers);
+} while ($cursor);
 ?>
 <!DOCTYPE html>
 <html lang="fr">
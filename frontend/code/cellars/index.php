@@ -12,8 +12,17 @@ if (!isset($_COOKIE['user_token']) || !isset($_COOKIE['user_id'])) {
 $user_token = $_COOKIE['user_token'];
 $user_id = $_COOKIE['user_id'];
 
-// Appelle l'API pour récupérer les caves
-$apiUrl = $API_URL . "/cellars";
+// Curseur de la page suivante (en-tête X-Next-Cursor), ou null
+function nextCursor($headers) {
+    foreach ($headers as $header) {
+        if (stripos($header, 'X-Next-Cursor:') === 0) {
+            return trim(substr($header, strlen('X-Next-Cursor:')));
+        }
+    }
+    return null;
+}
+
+// Appelle l'API pour récupérer les caves, page par page tant qu'elle renvoie un curseur
 $options = [
     'http' => [
         'header' => [
@@ -26,20 +35,31 @@ $options = [
 ];
 
 $context = stream_context_create($options);
-$response = @file_get_contents($apiUrl, false, $context);
+$cellars = [];
+$cursor = null;
+
+do {
+    $query = ['limit' => 1000];
+    if ($cursor) {
+        $query['cursor'] = $cursor;
+    }
+    $apiUrl = $API_URL . "/cellars?" . http_build_query($query);
+    $response = @file_get_contents($apiUrl, false, $context);
 
-if ($response === FALSE) {
-    $error = "Erreur de connexion à l'API.";
-    $cellars = [];
-} else {
+    if ($response === FALSE) {
+        $error = "Erreur de connexion à l'API.";
+        $cellars = [];
+        break;
+    }
     $result = json_decode($response, true);
     if (isset($result['error'])) {
         $error = $result['message'] ?? "Erreur inconnue.";
         $cellars = [];
-    } else {
-        $cellars = $result ?? [];
+        break;
     }
-}
+    $cellars = array_merge($cellars, $result ?? []);
+    $cursor = nextCursor($http_response_header ?? []);
+} while ($cursor);
 ?>
 <!DOCTYPE html>
 <html lang="fr">
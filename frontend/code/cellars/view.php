@@ -15,6 +15,16 @@ if (!$cellar_id) {
     die("ID de la cave manquant.");
 }
 
+// Curseur de la page suivante (en-tête X-Next-Cursor), ou null
+function nextCursor($headers) {
+    foreach ($headers as $header) {
+        if (stripos($header, 'X-Next-Cursor:') === 0) {
+            return trim(substr($header, strlen('X-Next-Cursor:')));
+        }
+    }
+    return null;
+}
+
 // 1. Récupère les détails de la cave
 $apiUrl = $API_URL . "/cellars/{$cellar_id}";
 $options = [
@@ -44,17 +54,28 @@ if ($response === FALSE) {
     }
 }
 
-// 2. Récupère les bouteilles de la cave
+// 2. Récupère les bouteilles de la cave, pages de 1000 tant que l'API renvoie un curseur
 $bottles = [];
-if ($cellar) {
-    $bottlesApiUrl = $API_URL . "/cellars/{$cellar_id}/bottles";
+$cursor = null;
+while ($cellar) {
+    $query = ['limit' => 1000, 'fields' => 'name,vintage,wine_type,region,quantity,price'];
+    if ($cursor) {
+        $query['cursor'] = $cursor;
+    }
+    $bottlesApiUrl = $API_URL . "/cellars/{$cellar_id}/bottles?" . http_build_query($query);
     $bottlesResponse = @file_get_contents($bottlesApiUrl, false, $context);
 
-    if ($bottlesResponse !== FALSE) {
-        $bottlesResult = json_decode($bottlesResponse, true);
-        if (!isset($bottlesResult['error'])) {
-            $bottles = $bottlesResult ?? [];
-        }
+    if ($bottlesResponse === FALSE) {
+        break;
+    }
+    $bottlesResult = json_decode($bottlesResponse, true);
+    if (isset($bottlesResult['error']) || !is_array($bottlesResult)) {
+        break;
+    }
+    $bottles = array_merge($bottles, $bottlesResult);
+    $cursor = nextCursor($http_response_header ?? []);
+    if (!$cursor) {
+        break;
     }
 }
 ?>